@@ -8,11 +8,80 @@ import subprocess
 import json
 import platform
 import os
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 class SystemAnalyzer:
-    def __init__(self):
+    # Сборщики данных: ключ report_data -> метод
+    COLLECTORS = {
+        'general_info': 'get_general_info',
+        'cpu_info': 'get_cpu_info',
+        'ram_info': 'get_ram_info',
+        'disk_info': 'get_disk_info',
+        'gpu_info': 'get_gpu_info',
+    }
+    # Все CIM-запросы одним процессом PowerShell (см. get_all_cim_info)
+    BATCH_COLLECTORS = dict.fromkeys(COLLECTORS, 'get_all_cim_info')
+    # На Linux те же ключи заполняются из /proc и /sys, без запуска процессов
+    LINUX_COLLECTORS = {
+        'general_info': 'get_general_info_linux',
+        'cpu_info': 'get_cpu_info_linux',
+        'ram_info': 'get_ram_info_linux',
+        'disk_info': 'get_disk_info_linux',
+        'gpu_info': 'get_gpu_info_linux',
+    }
+    # Таймауты сборщиков в секундах (systeminfo работает заметно дольше PowerShell)
+    COLLECTOR_TIMEOUTS = {
+        'general_info': 60,
+        'cpu_info': 20,
+        'ram_info': 20,
+        'disk_info': 20,
+        'gpu_info': 20,
+    }
+    
+    # Запросы CIM по ключам report_data (без ConvertTo-Json)
+    CIM_QUERIES = {
+        'cpu_info': "Get-CimInstance -ClassName Win32_Processor | Select-Object Name, NumberOfCores, NumberOfLogicalProcessors, MaxClockSpeed, Manufacturer",
+        'ram_info': "Get-CimInstance -ClassName Win32_PhysicalMemory | Select-Object Manufacturer, Capacity, Speed, MemoryType, PartNumber",
+        'disk_info': "Get-CimInstance -ClassName Win32_DiskDrive | Select-Object Model, Size, InterfaceType, MediaType, SerialNumber",
+        'gpu_info': 'Get-CimInstance -ClassName Win32_VideoController | Where-Object {$_.Name -notlike "*Remote*" -and $_.Name -notlike "*Microsoft*"} | Select-Object Name, DriverVersion, AdapterRAM, VideoProcessor',
+    }
+    # Только для общего запроса: заменяют отдельный запуск systeminfo
+    CIM_GENERAL_QUERIES = {
+        'os_info': "Get-CimInstance -ClassName Win32_OperatingSystem | Select-Object Caption, Version, BuildNumber",
+        'computer_info': "Get-CimInstance -ClassName Win32_ComputerSystem | Select-Object TotalPhysicalMemory",
+    }
+    
+    # Коды типа памяти SMBIOS (DMI type 17, смещение 0x12)
+    SMBIOS_MEMORY_TYPES = {
+        0x12: 'DDR', 0x13: 'DDR2', 0x18: 'DDR3', 0x1A: 'DDR4', 0x1B: 'LPDDR',
+        0x1C: 'LPDDR2', 0x1D: 'LPDDR3', 0x1E: 'LPDDR4', 0x22: 'DDR5', 0x23: 'LPDDR5',
+    }
+    # Префикс имени блочного устройства -> интерфейс
+    DISK_INTERFACES = {'nvme': 'NVMe', 'sd': 'SCSI', 'hd': 'IDE', 'vd': 'VirtIO', 'xvd': 'Xen', 'mmcblk': 'MMC'}
+    
+    def __init__(self, timeouts=None, linux_root='/', runner=None, backend=None, batch=True):
+        """
+        runner(args, timeout) -> stdout заменяет запуск процессов (например, FakeCommandRunner);
+        backend - 'windows' или 'linux', по умолчанию по текущей платформе;
+        batch=False - отдельный процесс на каждый запрос, как раньше.
+        """
         self.report_data = {}
+        self.backend = backend or ('linux' if platform.system() == "Linux" else 'windows')
+        if self.backend == 'linux':
+            self.collectors = self.LINUX_COLLECTORS
+        else:
+            self.collectors = self.BATCH_COLLECTORS if batch else self.COLLECTORS
+        self.linux_root = linux_root  # корень для /proc и /sys (другой - для проверки на снимке файлов)
+        self.runner = runner or self.run_process
+        self.commands_run = []  # имена запущенных программ
+        self.spawns_saved = 0
+        self.timeouts = {**self.COLLECTOR_TIMEOUTS, **(timeouts or {})}
+        self.timings = {}  # ключ сборщика -> время в секундах, 'total' - весь сбор
+        self.collector_status = {}  # ключ сборщика -> 'готово', 'нет данных', 'таймаут' или ошибка
         self.is_admin = self.check_admin_privileges()
     
     def check_admin_privileges(self):
@@ -54,34 +123,45 @@ class SystemAnalyzer:
             print(f"⚠️ Ошибка при определении пути к рабочему столу: {e}")
             return os.path.expanduser("~")
     
-    def run_powershell_command(self, command):
-        """Выполнение PowerShell команды и возврат результата"""
+    def run_process(self, args, timeout=None):
+        """Запуск программы и ее вывод; по истечении timeout секунд процесс завершается"""
+        result = subprocess.run(
+            args,
+            capture_output=True,
+            text=True,
+            check=True,
+            encoding='utf-8',
+            timeout=timeout
+        )
+        return result.stdout
+    
+    def run_command(self, args, timeout=None):
+        """Запуск программы через self.runner с учетом числа запусков"""
+        self.commands_run.append(args[0])
+        return self.runner(args, timeout)
+    
+    @property
+    def process_spawns(self):
+        return len(self.commands_run)
+    
+    def run_powershell_command(self, command, timeout=None):
+        """Выполнение PowerShell команды и возврат результата
+        
+        По истечении timeout секунд процесс PowerShell завершается, а
+        subprocess.TimeoutExpired передается дальше - сборщик получает статус 'таймаут'.
+        """
         try:
-            result = subprocess.run(
-                ["powershell", "-Command", command],
-                capture_output=True,
-                text=True,
-                check=True,
-                encoding='utf-8'
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
+            return self.run_command(["powershell", "-NoProfile", "-Command", command], timeout).strip()
+        except (subprocess.CalledProcessError, OSError) as e:
             return f"Ошибка: {e}"
     
-    def get_general_info(self):
+    def get_general_info(self, timeout=None):
         """Получение общей информации о системе"""
         print("🔍 Получение общей информации о системе...")
         
         # Используем systeminfo для получения общей информации
         try:
-            system_info = subprocess.run(
-                ["systeminfo"], 
-                capture_output=True, 
-                text=True, 
-                check=True,
-                encoding='utf-8'
-            )
-            info_lines = system_info.stdout.split('\n')
+            info_lines = self.run_command(["systeminfo"], timeout).split('\n')
             
             # Извлекаем ключевую информацию
             os_name = next((line.split(":")[1].strip() for line in info_lines if "OS Name" in line), "N/A")
@@ -89,45 +169,54 @@ class SystemAnalyzer:
             processor = next((line.split(":")[1].strip() for line in info_lines if "Processor(s)" in line), "N/A")
             total_ram = next((line.split(":")[1].strip() for line in info_lines if "Total Physical Memory" in line), "N/A")
             
-            self.report_data['general_info'] = {
+            return {
                 'OS Name': os_name,
                 'OS Version': os_version,
                 'Processor': processor,
                 'Total RAM': total_ram,
-                'Architecture': platform.architecture()[0],
+                'Architecture': self.python_architecture(),
                 'Python Version': platform.python_version(),
                 'System': platform.system(),
                 'Release': platform.release()
             }
+        except subprocess.TimeoutExpired:
+            raise
         except Exception as e:
             print(f"⚠️ Ошибка при получении общей информации: {e}")
             # Альтернативный способ получения информации
-            self.report_data['general_info'] = {
-                'OS Name': platform.system(),
-                'OS Version': platform.release(),
-                'Processor': 'N/A',
-                'Total RAM': 'N/A',
-                'Architecture': platform.architecture()[0],
-                'Python Version': platform.python_version()
-            }
+            return self.fallback_general_info()
     
-    def get_cpu_info(self):
+    @staticmethod
+    def python_architecture():
+        """Разрядность интерпретатора ('64bit') - platform.architecture() на Linux запускает file"""
+        return f"{struct.calcsize('P') * 8}bit"
+    
+    def fallback_general_info(self):
+        """Общая информация только из модуля platform, без внешних программ"""
+        return {
+            'OS Name': platform.system(),
+            'OS Version': platform.release(),
+            'Processor': 'N/A',
+            'Total RAM': 'N/A',
+            'Architecture': self.python_architecture(),
+            'Python Version': platform.python_version()
+        }
+    
+    def get_cpu_info(self, timeout=None):
         """Получение информации о процессоре"""
         print("🔍 Анализ процессора...")
         
-        command = """
-        Get-CimInstance -ClassName Win32_Processor | Select-Object Name, NumberOfCores, NumberOfLogicalProcessors, MaxClockSpeed, Manufacturer | ConvertTo-Json
-        """
+        command = self.CIM_QUERIES['cpu_info'] + " | ConvertTo-Json"
         
-        result = self.run_powershell_command(command)
+        result = self.run_powershell_command(command, timeout)
         if result and not result.startswith("Ошибка"):
             try:
                 cpu_info = json.loads(result) if result.startswith('[') else [json.loads(result)]
-                self.report_data['cpu_info'] = cpu_info
+                return self.convert_cim_items('cpu_info', cpu_info)
             except json.JSONDecodeError as e:
                 print(f"⚠️ Ошибка парсинга данных процессора: {e}")
                 # Альтернативная информация о процессоре
-                self.report_data['cpu_info'] = [{
+                return [{
                     'Name': platform.processor(),
                     'NumberOfCores': 'N/A',
                     'NumberOfLogicalProcessors': 'N/A',
@@ -135,74 +224,425 @@ class SystemAnalyzer:
                     'Manufacturer': 'N/A'
                 }]
     
-    def get_ram_info(self):
+    def get_ram_info(self, timeout=None):
         """Получение информации об оперативной памяти"""
         print("🔍 Анализ оперативной памяти...")
         
-        command = """
-        Get-CimInstance -ClassName Win32_PhysicalMemory | Select-Object Manufacturer, Capacity, Speed, MemoryType, PartNumber | ConvertTo-Json
-        """
+        command = self.CIM_QUERIES['ram_info'] + " | ConvertTo-Json"
         
-        result = self.run_powershell_command(command)
+        result = self.run_powershell_command(command, timeout)
         if result and not result.startswith("Ошибка"):
             try:
                 ram_info = json.loads(result) if result.startswith('[') else [json.loads(result)]
-                
-                # Конвертируем Capacity в GB
-                for module in ram_info:
-                    if 'Capacity' in module and module['Capacity']:
-                        module['Capacity_GB'] = round(module['Capacity'] / (1024**3), 2)
-                
-                self.report_data['ram_info'] = ram_info
+                return self.convert_cim_items('ram_info', ram_info)
             except json.JSONDecodeError as e:
                 print(f"⚠️ Ошибка парсинга данных памяти: {e}")
-                self.report_data['ram_info'] = []
-        else:
-            self.report_data['ram_info'] = []
+        return []
     
-    def get_disk_info(self):
+    def get_disk_info(self, timeout=None):
         """Получение информации о накопителях"""
         print("🔍 Анализ накопителей...")
         
-        command = """
-        Get-CimInstance -ClassName Win32_DiskDrive | Select-Object Model, Size, InterfaceType, MediaType, SerialNumber | ConvertTo-Json
-        """
+        command = self.CIM_QUERIES['disk_info'] + " | ConvertTo-Json"
         
-        result = self.run_powershell_command(command)
+        result = self.run_powershell_command(command, timeout)
         if result and not result.startswith("Ошибка"):
             try:
                 disk_info = json.loads(result) if result.startswith('[') else [json.loads(result)]
-                
-                # Конвертируем Size в GB
-                for disk in disk_info:
-                    if 'Size' in disk and disk['Size']:
-                        disk['Size_GB'] = round(disk['Size'] / (1024**3), 2)
-                
-                self.report_data['disk_info'] = disk_info
+                return self.convert_cim_items('disk_info', disk_info)
             except json.JSONDecodeError as e:
                 print(f"⚠️ Ошибка парсинга данных дисков: {e}")
-                self.report_data['disk_info'] = []
-        else:
-            self.report_data['disk_info'] = []
+        return []
     
-    def get_gpu_info(self):
+    def get_gpu_info(self, timeout=None):
         """Получение информации о видеокартах"""
         print("🔍 Анализ видеокарт...")
         
-        command = """
-        Get-CimInstance -ClassName Win32_VideoController | Where-Object {$_.Name -notlike "*Remote*" -and $_.Name -notlike "*Microsoft*"} | Select-Object Name, DriverVersion, AdapterRAM, VideoProcessor | ConvertTo-Json
-        """
+        command = self.CIM_QUERIES['gpu_info'] + " | ConvertTo-Json"
         
-        result = self.run_powershell_command(command)
+        result = self.run_powershell_command(command, timeout)
         if result and not result.startswith("Ошибка"):
             try:
                 gpu_info = json.loads(result) if result.startswith('[') else [json.loads(result)]
-                self.report_data['gpu_info'] = gpu_info
+                return self.convert_cim_items('gpu_info', gpu_info)
             except json.JSONDecodeError as e:
                 print(f"⚠️ Ошибка парсинга данных видеокарт: {e}")
-                self.report_data['gpu_info'] = []
+        return []
+    
+    def convert_cim_items(self, key, items):
+        """Записи CIM для report_data[key]; Capacity и Size дополняются объемом в GB"""
+        size_field = {'ram_info': 'Capacity', 'disk_info': 'Size'}.get(key)
+        for item in items:
+            if size_field and item.get(size_field):
+                item[size_field + '_GB'] = round(item[size_field] / (1024**3), 2)
+        return items
+    
+    def build_cim_script(self):
+        """Скрипт PowerShell со всеми CIM-запросами и одним JSON-документом на выходе
+        
+        Ошибка одного запроса не прерывает остальные: вместо списка записей
+        по его ключу возвращается {"error": "..."}.
+        """
+        lines = ["$ErrorActionPreference = 'Stop'", "$result = [ordered]@{}"]
+        for key, query in {**self.CIM_QUERIES, **self.CIM_GENERAL_QUERIES}.items():
+            # @(...) - список даже из одной записи
+            lines.append(f"try {{ $result['{key}'] = @({query}) }} "
+                         f"catch {{ $result['{key}'] = @{{ error = $_.Exception.Message }} }}")
+        lines.append("$result | ConvertTo-Json -Depth 4 -Compress")
+        return "\n".join(lines)
+    
+    def get_all_cim_info(self, timeout=None):
+        """Все данные Windows одним процессом PowerShell вместо systeminfo и четырех запусков
+        
+        Возвращает словарь по ключам report_data. Если запрос одного ключа
+        не удался, вместо данных по ключу стоит RuntimeError с текстом ошибки -
+        collect_all показывает его статусом 'ошибка: ...', а не 'нет данных'.
+        Сбой всего запроса - RuntimeError для всех ключей.
+        """
+        print("🔍 Сбор данных одним запросом PowerShell (CIM)...")
+        
+        result = self.run_powershell_command(self.build_cim_script(), timeout)
+        if not result or result.startswith("Ошибка"):
+            print(f"⚠️ Ошибка при выполнении общего запроса: {result}")
+            raise RuntimeError(result.removeprefix("Ошибка: ") or "пустой ответ PowerShell")
+        try:
+            document = json.loads(result)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Ошибка парсинга общего запроса: {e}")
+            raise RuntimeError(f"некорректный JSON: {e}") from e
+        
+        # Разбираем документ по ключам сборщиков
+        records = {}
+        errors = {}
+        for key in {**self.CIM_QUERIES, **self.CIM_GENERAL_QUERIES}:
+            items = document.get(key) or []
+            if isinstance(items, dict) and 'error' in items:
+                print(f"⚠️ Ошибка запроса {key}: {items['error']}")
+                errors[key] = RuntimeError(items['error'])
+                items = []
+            records[key] = [items] if isinstance(items, dict) else items
+        data = {key: errors.get(key) or self.convert_cim_items(key, records[key]) for key in self.CIM_QUERIES}
+        
+        os_info = (records['os_info'] or [{}])[0]
+        total_memory = (records['computer_info'] or [{}])[0].get('TotalPhysicalMemory')
+        general_info = self.fallback_general_info()
+        general_info.update({
+            'OS Name': os_info.get('Caption', general_info['OS Name']),
+            'OS Version': f"{os_info['Version']} Build {os_info.get('BuildNumber', 'N/A')}" if os_info.get('Version') else general_info['OS Version'],
+            'Processor': ', '.join(cpu.get('Name', 'N/A') for cpu in records['cpu_info']) or 'N/A',
+            # Как в systeminfo: "16,297 MB"
+            'Total RAM': f"{total_memory // 1024**2:,} MB" if total_memory else 'N/A',
+            'System': platform.system(),
+            'Release': platform.release()
+        })
+        # Без Win32_OperatingSystem общие сведения - только запасные из platform
+        data['general_info'] = errors.get('os_info') or general_info
+        return data
+    
+    def read_linux_file(self, path, default=None):
+        """Содержимое файла /proc или /sys без пробелов по краям"""
+        try:
+            with open(os.path.join(self.linux_root, path.lstrip('/')), encoding='utf-8', errors='replace') as f:
+                return f.read().strip()
+        except OSError:
+            return default
+    
+    def list_linux_dir(self, path):
+        """Имена в каталоге /sys, пустой список если каталога нет"""
+        try:
+            return sorted(os.listdir(os.path.join(self.linux_root, path.lstrip('/'))))
+        except OSError:
+            return []
+    
+    def read_linux_pairs(self, path):
+        """Файл вида 'ключ: значение' (/proc/cpuinfo, /proc/meminfo) -> список словарей по пустым строкам"""
+        blocks = [{}]
+        for line in (self.read_linux_file(path) or '').splitlines():
+            if not line.strip():
+                if blocks[-1]:
+                    blocks.append({})
+                continue
+            key, _, value = line.partition(':')
+            blocks[-1][key.strip()] = value.strip()
+        return [block for block in blocks if block]
+    
+    def get_general_info_linux(self, timeout=None):
+        """Общая информация о системе из /etc/os-release и /proc"""
+        print("🔍 Получение общей информации о системе...")
+        
+        os_release = {}
+        for line in (self.read_linux_file('/etc/os-release') or '').splitlines():
+            key, _, value = line.partition('=')
+            os_release[key] = value.strip('"')
+        cpus = self.read_linux_pairs('/proc/cpuinfo')
+        memory = (self.read_linux_pairs('/proc/meminfo') or [{}])[0]
+        total_kb = memory.get('MemTotal', '').split()
+        
+        return {
+            'OS Name': os_release.get('PRETTY_NAME', platform.system()),
+            'OS Version': self.read_linux_file('/proc/sys/kernel/osrelease', platform.release()),
+            'Processor': cpus[0].get('model name', platform.machine()) if cpus else 'N/A',
+            'Total RAM': f"{int(total_kb[0]) // 1024} MB" if total_kb else 'N/A',
+            'Architecture': self.python_architecture(),
+            'Python Version': platform.python_version(),
+            'System': platform.system(),
+            'Release': platform.release()
+        }
+    
+    def get_cpu_info_linux(self, timeout=None):
+        """Процессоры из /proc/cpuinfo: одна запись на физический процессор (сокет)"""
+        print("🔍 Анализ процессора...")
+        
+        sockets = {}
+        for cpu in self.read_linux_pairs('/proc/cpuinfo'):
+            if 'processor' not in cpu:
+                continue
+            socket = sockets.setdefault(cpu.get('physical id', '0'), {'cpu': cpu, 'cores': set(), 'logical': 0})
+            socket['cores'].add(cpu.get('core id', cpu['processor']))
+            socket['logical'] += 1
+        
+        # Максимальная частота из cpufreq (кГц), иначе текущая из /proc/cpuinfo
+        max_khz = self.read_linux_file('/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq')
+        cpu_info = []
+        for socket in sockets.values():
+            cpu = socket['cpu']
+            if max_khz and max_khz.isdigit():
+                speed = int(max_khz) // 1000
+            else:
+                speed = round(float(cpu['cpu MHz'])) if 'cpu MHz' in cpu else 'N/A'
+            cpu_info.append({
+                'Name': cpu.get('model name', cpu.get('Model', platform.machine())),
+                'NumberOfCores': len(socket['cores']),
+                'NumberOfLogicalProcessors': socket['logical'],
+                'MaxClockSpeed': speed,
+                'Manufacturer': cpu.get('vendor_id', cpu.get('CPU implementer', 'N/A'))
+            })
+        return cpu_info
+    
+    def parse_dmi_memory_device(self, raw):
+        """Модуль памяти из записи SMBIOS type 17 (/sys/firmware/dmi/entries/17-*/raw)"""
+        length = raw[1]
+        if length < 0x1B:
+            return None
+        strings = raw[length:].split(b'\0')
+        
+        def string(offset):
+            index = raw[offset] if offset < length else 0
+            if not 0 < index <= len(strings):
+                return 'N/A'
+            return strings[index - 1].decode('utf-8', errors='replace').strip() or 'N/A'
+        
+        size = int.from_bytes(raw[0x0C:0x0E], 'little')
+        if size == 0:
+            return None  # слот пустой
+        if size == 0x7FFF and length >= 0x20:
+            capacity = int.from_bytes(raw[0x1C:0x20], 'little') * 1024**2
+        elif size == 0xFFFF:
+            capacity = None
+        elif size & 0x8000:
+            capacity = (size & 0x7FFF) * 1024
         else:
-            self.report_data['gpu_info'] = []
+            capacity = size * 1024**2
+        
+        speed = int.from_bytes(raw[0x15:0x17], 'little')
+        return {
+            'Manufacturer': string(0x17),
+            'Capacity': capacity,
+            'Speed': speed or 'N/A',
+            'MemoryType': self.SMBIOS_MEMORY_TYPES.get(raw[0x12], raw[0x12]),
+            'PartNumber': string(0x1A)
+        }
+    
+    def get_ram_info_linux(self, timeout=None):
+        """Модули памяти из таблиц DMI (нужны права root), иначе общий объем из /proc/meminfo"""
+        print("🔍 Анализ оперативной памяти...")
+        
+        ram_info = []
+        for entry in self.list_linux_dir('/sys/firmware/dmi/entries'):
+            if not entry.startswith('17-'):
+                continue
+            try:
+                with open(os.path.join(self.linux_root, 'sys/firmware/dmi/entries', entry, 'raw'), 'rb') as f:
+                    module = self.parse_dmi_memory_device(f.read())
+            except OSError:
+                continue
+            if module:
+                ram_info.append(module)
+        
+        if not ram_info:
+            memory = (self.read_linux_pairs('/proc/meminfo') or [{}])[0]
+            total_kb = memory.get('MemTotal', '').split()
+            if total_kb:
+                ram_info.append({
+                    'Manufacturer': 'N/A',
+                    'Capacity': int(total_kb[0]) * 1024,
+                    'Speed': 'N/A',
+                    'MemoryType': 'N/A',
+                    'PartNumber': 'N/A'
+                })
+        
+        # Конвертируем Capacity в GB
+        for module in ram_info:
+            if module['Capacity']:
+                module['Capacity_GB'] = round(module['Capacity'] / (1024**3), 2)
+        return ram_info
+    
+    def get_disk_info_linux(self, timeout=None):
+        """Физические диски из /sys/block (loop, zram, dm и т.п. пропускаются)"""
+        print("🔍 Анализ накопителей...")
+        
+        disk_info = []
+        for name in self.list_linux_dir('/sys/block'):
+            block = f'/sys/block/{name}'
+            # У виртуальных устройств нет каталога device
+            if not os.path.exists(os.path.join(self.linux_root, block.lstrip('/'), 'device')):
+                continue
+            sectors = self.read_linux_file(f'{block}/size', '0')
+            prefix = next((prefix for prefix in sorted(self.DISK_INTERFACES, key=len, reverse=True)
+                           if name.startswith(prefix)), None)
+            if self.read_linux_file(f'{block}/removable') == '1':
+                media = 'Removable Media'
+            else:
+                media = {'0': 'SSD', '1': 'HDD'}.get(self.read_linux_file(f'{block}/queue/rotational'), 'N/A')
+            size = int(sectors) * 512 if sectors.isdigit() else 0
+            disk_info.append({
+                'Model': self.read_linux_file(f'{block}/device/model') or name,
+                'Size': size,
+                'Size_GB': round(size / (1024**3), 2),
+                'InterfaceType': self.DISK_INTERFACES.get(prefix, 'N/A'),
+                'MediaType': media,
+                'SerialNumber': self.read_linux_file(f'{block}/device/serial')
+                                or self.read_linux_file(f'{block}/serial') or 'N/A'
+            })
+        return disk_info
+    
+    def lookup_pci_name(self, vendor, device):
+        """Название устройства по базе pci.ids, если она установлена"""
+        for path in ('/usr/share/hwdata/pci.ids', '/usr/share/misc/pci.ids'):
+            try:
+                with open(os.path.join(self.linux_root, path.lstrip('/')), encoding='utf-8', errors='replace') as f:
+                    vendor_name = None
+                    for line in f:
+                        if vendor_name is None:
+                            if line.startswith(vendor + '  '):
+                                vendor_name = line[len(vendor):].strip()
+                        elif line.startswith('\t' + device + '  '):
+                            return f"{vendor_name} {line[len(device) + 1:].strip()}"
+                        elif not line.startswith(('\t', '#')) and line.strip():
+                            break  # устройства производителя закончились
+                    return vendor_name
+            except OSError:
+                continue
+        return None
+    
+    def get_gpu_info_linux(self, timeout=None):
+        """Видеокарты из /sys/class/drm (card0, card1, ... без разъемов вида card0-HDMI-A-1)"""
+        print("🔍 Анализ видеокарт...")
+        
+        gpu_info = []
+        for card in self.list_linux_dir('/sys/class/drm'):
+            if not card.startswith('card') or not card[4:].isdigit():
+                continue
+            device = f'/sys/class/drm/{card}/device'
+            vendor = (self.read_linux_file(f'{device}/vendor') or '').removeprefix('0x')
+            model = (self.read_linux_file(f'{device}/device') or '').removeprefix('0x')
+            driver_link = os.path.join(self.linux_root, device.lstrip('/'), 'driver')
+            driver = os.path.basename(os.path.realpath(driver_link)) if os.path.islink(driver_link) else None
+            version = self.read_linux_file(f'/sys/module/{driver}/version') if driver else None
+            vram = self.read_linux_file(f'{device}/mem_info_vram_total')  # amdgpu
+            gpu_info.append({
+                'Name': self.lookup_pci_name(vendor, model) or f"PCI {vendor}:{model}",
+                'DriverVersion': ' '.join(filter(None, (driver, version))) or 'N/A',
+                'AdapterRAM': int(vram) if vram and vram.isdigit() else None,
+                'VideoProcessor': f"{vendor}:{model}"
+            })
+        return gpu_info
+    
+    def _run_collector(self, keys, timeout):
+        """Запуск одного сборщика в потоке с замером времени; keys - заполняемые им ключи
+        
+        Возвращает (данные по ключам, статус сбоя или None, время в секундах).
+        В report_data данные записывает collect_all - и только если сборщик
+        уложился в срок.
+        """
+        started = time.perf_counter()
+        try:
+            result = getattr(self, self.collectors[keys[0]])(timeout=timeout)
+            # Общий для нескольких ключей сборщик (get_all_cim_info) возвращает словарь по ключам
+            data = result if len(keys) > 1 else {keys[0]: result}
+            return data, None, time.perf_counter() - started
+        except subprocess.TimeoutExpired:
+            return {}, 'таймаут', time.perf_counter() - started
+        except Exception as e:
+            return {}, f"ошибка: {e}", time.perf_counter() - started
+    
+    def _start_collector(self, keys, timeout):
+        """_run_collector в фоновом потоке; результат - через Future"""
+        future = Future()
+        thread = threading.Thread(target=lambda: future.set_result(self._run_collector(keys, timeout)),
+                                  name=f"collector-{keys[0]}", daemon=True)
+        thread.start()
+        return future
+    
+    def collect_all(self):
+        """Параллельный запуск всех сборщиков
+        
+        Каждый сборщик работает в своем потоке со своим таймаутом: его процесс
+        завершается по таймауту, а отчет не ждет сборщик дольше этого срока.
+        Потоки фоновые (daemon), поэтому зависший сборщик не держит и выход из программы.
+        Сборщик, не уложившийся в срок, помечается как 'таймаут' и получает
+        пустые данные - то, что он вернет позже, в отчет не попадает. Один
+        метод на несколько ключей (общий CIM-запрос) запускается один раз
+        с наибольшим из их таймаутов.
+        """
+        self.report_data = {}
+        self.timings = {}
+        self.collector_status = {}
+        self.commands_run = []
+        started = time.perf_counter()
+        groups = {}
+        for key, method in self.collectors.items():
+            groups.setdefault(method, []).append(key)
+        futures = {}
+        for keys in groups.values():
+            timeout = max(self.timeouts[key] for key in keys)
+            futures[tuple(keys)] = (self._start_collector(keys, timeout), timeout)
+        
+        for keys, (future, timeout) in futures.items():
+            remaining = timeout - (time.perf_counter() - started)
+            try:
+                data, failure, seconds = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                data, failure, seconds = {}, 'таймаут', time.perf_counter() - started
+            for key in keys:
+                value = data.get(key)
+                if isinstance(value, Exception):
+                    # Ошибка одного ключа общего запроса
+                    self.collector_status[key] = f"ошибка: {value}"
+                else:
+                    if value is not None:
+                        self.report_data[key] = value
+                    self.collector_status[key] = failure or ('готово' if value else 'нет данных')
+                self.timings[key] = seconds
+        
+        for key in self.collectors:
+            if key not in self.report_data:
+                self.report_data[key] = self.fallback_general_info() if key == 'general_info' else []
+        self.timings['total'] = time.perf_counter() - started
+        # Экономия есть только у общего запроса на Windows: раньше там каждый сборщик
+        # запускал свой процесс, а на Linux процессы не запускаются вовсе
+        batched = self.collectors is self.BATCH_COLLECTORS
+        self.spawns_saved = max(len(self.COLLECTORS) - self.process_spawns, 0) if batched else 0
+        
+        print("\n⏱️  Время сбора данных:")
+        for key in self.collectors:
+            print(f"   {key}: {self.timings[key]:.2f} с ({self.collector_status[key]})")
+        print(f"   Всего: {self.timings['total']:.2f} с")
+        print(f"   Запущено процессов: {self.process_spawns}{self.spawns_note()}\n")
+    
+    def spawns_note(self):
+        """Пояснение к числу процессов: экономия есть только у общего запроса на Windows"""
+        return f" (сэкономлено: {self.spawns_saved})" if self.collectors is self.BATCH_COLLECTORS else ""
     
     def generate_report(self):
         """Генерация итогового отчета"""
@@ -282,6 +722,15 @@ class SystemAnalyzer:
                 else:
                     f.write("--- ВИДЕОКАРТЫ (GPU) ---\n")
                     f.write("Информация о видеокартах недоступна\n\n")
+                
+                # Время сбора
+                if self.timings:
+                    f.write("--- ВРЕМЯ СБОРА ДАННЫХ ---\n")
+                    for key in self.collectors:
+                        if key in self.timings:
+                            f.write(f"{key}: {self.timings[key]:.2f} с ({self.collector_status.get(key, 'N/A')})\n")
+                    f.write(f"Всего: {self.timings.get('total', 0):.2f} с\n")
+                    f.write(f"Запущено процессов: {self.process_spawns}{self.spawns_note()}\n\n")
             
             return report_path
             
@@ -335,11 +784,7 @@ class SystemAnalyzer:
             print("⚠️  ВНИМАНИЕ: Скрипт запущен без прав администратора.")
             print("   Некоторые данные могут быть недоступны.\n")
         
-        self.get_general_info()
-        self.get_cpu_info()
-        self.get_ram_info()
-        self.get_disk_info()
-        self.get_gpu_info()
+        self.collect_all()
         
         report_path = self.generate_report()
         self.display_summary()
@@ -347,6 +792,25 @@ class SystemAnalyzer:
         print(f"\n✅ Отчет сохранен: {report_path}")
         print("🎯 Анализ завершен!")
 
+class FakeCommandRunner:
+    """Подмена запуска процессов для проверки анализатора без Windows
+    
+    responses: имя программы ('powershell', 'systeminfo') -> вывод
+    или функция(args) -> вывод. Для неизвестной программы - FileNotFoundError,
+    как при настоящем запуске. Все вызовы сохраняются в calls.
+    """
+    
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+    
+    def __call__(self, args, timeout=None):
+        self.calls.append(args)
+        if args[0] not in self.responses:
+            raise FileNotFoundError(f"{args[0]}: программа не найдена")
+        response = self.responses[args[0]]
+        return response(args) if callable(response) else response
+
 def main():
     """Основная функция"""
     print("System Analyzer - Анализатор системы")
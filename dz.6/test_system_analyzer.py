@@ -0,0 +1,91 @@
+"""Проверки SystemAnalyzer без Windows через FakeCommandRunner: python -m unittest из каталога dz.6"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from system_analyzer import FakeCommandRunner, SystemAnalyzer
+
+CIM_DOCUMENT = {
+    'cpu_info': [{'Name': 'Test CPU', 'NumberOfCores': 4, 'NumberOfLogicalProcessors': 8,
+                  'MaxClockSpeed': 3000, 'Manufacturer': 'Test'}],
+    'ram_info': {'Manufacturer': 'Test', 'Capacity': 8 * 1024**3, 'Speed': 3200,
+                 'MemoryType': 0, 'PartNumber': 'RAM-1'},
+    'disk_info': [{'Model': 'Test SSD', 'Size': 512 * 1024**3, 'InterfaceType': 'SCSI',
+                   'MediaType': 'Fixed hard disk media', 'SerialNumber': '42'}],
+    'gpu_info': [{'Name': 'Test GPU', 'DriverVersion': '1.0', 'AdapterRAM': 1024**3, 'VideoProcessor': 'GPU'}],
+    'os_info': {'Caption': 'Microsoft Windows 11 Pro', 'Version': '10.0.22631', 'BuildNumber': '22631'},
+    'computer_info': {'TotalPhysicalMemory': 8 * 1024**3},
+}
+
+
+def collect(analyzer):
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.collect_all()
+    return analyzer
+
+
+class BatchCollectorTest(unittest.TestCase):
+    """Общий CIM-запрос: один процесс PowerShell на все ключи"""
+
+    def analyzer(self, document):
+        runner = FakeCommandRunner({'powershell': json.dumps(document)})
+        return collect(SystemAnalyzer(runner=runner, backend='windows')), runner
+
+    def test_single_spawn_for_all_collectors(self):
+        analyzer, runner = self.analyzer(CIM_DOCUMENT)
+        self.assertEqual([args[0] for args in runner.calls], ['powershell'])
+        self.assertEqual(analyzer.process_spawns, 1)
+        self.assertEqual(analyzer.spawns_saved, len(SystemAnalyzer.COLLECTORS) - 1)
+        self.assertEqual(set(analyzer.collector_status.values()), {'готово'})
+        self.assertEqual(analyzer.report_data['ram_info'][0]['Capacity_GB'], 8.0)
+        self.assertEqual(analyzer.report_data['general_info']['OS Name'], 'Microsoft Windows 11 Pro')
+
+    def test_failed_key_reported_as_error(self):
+        analyzer, _ = self.analyzer(dict(CIM_DOCUMENT, disk_info={'error': 'Access denied'}))
+        self.assertEqual(analyzer.collector_status['disk_info'], 'ошибка: Access denied')
+        self.assertEqual(analyzer.report_data['disk_info'], [])
+        self.assertEqual(analyzer.collector_status['cpu_info'], 'готово')
+
+    def test_empty_key_reported_as_no_data(self):
+        analyzer, _ = self.analyzer(dict(CIM_DOCUMENT, gpu_info=[]))
+        self.assertEqual(analyzer.collector_status['gpu_info'], 'нет данных')
+
+    def test_failed_batch_marks_every_key(self):
+        runner = FakeCommandRunner({})  # powershell не найден
+        analyzer = collect(SystemAnalyzer(runner=runner, backend='windows'))
+        self.assertTrue(all(status.startswith('ошибка') for status in analyzer.collector_status.values()))
+        self.assertEqual(analyzer.report_data['cpu_info'], [])
+
+
+class SeparateCollectorTest(unittest.TestCase):
+    """batch=False: отдельный процесс на каждый сборщик, экономии нет"""
+
+    def test_one_spawn_per_collector(self):
+        runner = FakeCommandRunner({'powershell': '[]', 'systeminfo': 'OS Name: Windows\n'})
+        analyzer = collect(SystemAnalyzer(runner=runner, backend='windows', batch=False))
+        self.assertEqual(analyzer.process_spawns, len(SystemAnalyzer.COLLECTORS))
+        self.assertEqual(analyzer.spawns_saved, 0)
+
+
+class LinuxCollectorTest(unittest.TestCase):
+    """Linux: данные из /proc и /sys без запуска процессов"""
+
+    def test_no_processes_spawned(self):
+        with mock.patch.object(subprocess, 'Popen', side_effect=AssertionError("запуск процесса")):
+            analyzer = collect(SystemAnalyzer(backend='linux'))
+            general = analyzer.fallback_general_info()
+        self.assertEqual(analyzer.process_spawns, 0)
+        self.assertEqual(analyzer.spawns_saved, 0)
+        self.assertEqual(general['Architecture'], analyzer.report_data['general_info']['Architecture'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,1213 @@
+import bz2
+import ctypes
+import gzip
+import lzma
+import mmap
+import os
 import re
+import select
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections import Counter, deque
+from datetime import datetime
+from itertools import compress
+from concurrent.futures import ProcessPoolExecutor
+
+LEVELS = ('INFO', 'ERROR', 'DEBUG', 'WARNING')
+
+# Фильтры из заданий 4, 5 и 7: имя -> (шаблон, флаги re)
+DEFAULT_FILTERS = {
+    'error': ('ERROR', 0),
+    'timeout': ('timeout', re.IGNORECASE),
+    'warning': ('WARNING', 0),
+}
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class LogReport:
+    """Итог одного прохода по логу: счетчики, совпадения фильтров и хвост
+
+    matches хранит не больше max_matches строк на фильтр (номер строки, текст),
+    counts - полное число строк с совпадением, так что память ограничена
+    при любом размере файла.
+    """
+
+    def __init__(self, filters=None, tail=3, max_matches=10_000):
+        filters = DEFAULT_FILTERS if filters is None else filters
+        self.lines = 0
+        self.bytes = 0
+        self.levels = dict.fromkeys(LEVELS, 0)
+        self.counts = dict.fromkeys(filters, 0)
+        self.matches = {name: [] for name in filters}
+        self.tail = deque(maxlen=tail)
+        self.max_matches = max_matches
+        # Время чтения (для сжатых файлов - распаковки) и разбора, суммарно по процессам
+        self.read_seconds = 0.0
+        self.scan_seconds = 0.0
+
+    def merge(self, other):
+        """Добавление итога следующего по порядку куска файла"""
+        for name, matches in other.matches.items():
+            room = None if self.max_matches is None else self.max_matches - len(self.matches[name])
+            self.matches[name].extend((line + self.lines, text) for line, text in matches[:room])
+            self.counts[name] += other.counts[name]
+        for level, count in other.levels.items():
+            self.levels[level] += count
+        self.tail.extend(other.tail)
+        self.lines += other.lines
+        self.bytes += other.bytes
+        self.read_seconds += other.read_seconds
+        self.scan_seconds += other.scan_seconds
+        return self
+
+
+def keyword(word, ignore_case=False):
+    """Правило "целое слово" для фильтров: keyword('timeout', True)"""
+    return (rf'\b{re.escape(word)}\b', re.IGNORECASE if ignore_case else 0)
+
+
+def _trie_pattern(words):
+    """Одно регулярное выражение-дерево для набора строк: общие начала не повторяются
+
+    Из совпадающих в одной позиции строк выражение выбирает самую длинную.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for byte in word:
+            node = node.setdefault(byte, {})
+        node[None] = {}
+
+    def build(node):
+        branches = [re.escape(bytes([byte])) + build(child)
+                    for byte, child in sorted(item for item in node.items() if item[0] is not None)]
+        if not branches:
+            return b''
+        pattern = branches[0] if len(branches) == 1 else b'(?:' + b'|'.join(branches) + b')'
+        if None in node:
+            pattern = (b'(?:' + pattern + b')?') if len(branches) == 1 else pattern + b'?'
+        return pattern
+
+    return build(trie)
+
+
+class RuleSet:
+    """Набор правил-фильтров, проверяемый без отдельного прохода на каждое правило
+
+    Правило - пара (шаблон, флаги re), как в DEFAULT_FILTERS. Сначала общий
+    для всех правил проход находит, какие правила вообще встречаются в блоке,
+    и только они считаются своим findall:
+    - слова (r'\bслово\b', см. keyword) и подстроки из букв, цифр и '_':
+      блок разбивается на множество различных слов; слово-правило ищется
+      в нем как элемент, подстрока - выражением-деревом по всем подстрокам
+      в склеенном словаре, который намного меньше блока. Цена почти не зависит
+      от числа правил;
+    - прочие регулярные выражения: общая альтернатива находит строки-кандидаты,
+      и правила проверяются только на них.
+    Остальные подстроки (с пробелами, скобками) и наборы до SEPARATE_RULES
+    правил проверяются сразу отдельным findall - поиск строки без спецсимволов
+    в re и так быстрый.
+    Регистронезависимые подстроки и слова ищутся в блоке в нижнем регистре.
+    Байтовые выражения знают только ASCII: bytes.lower(), re.IGNORECASE, \b и \w
+    не видят кириллицу. Поэтому подстроки и выражения с не-ASCII символами,
+    регистронезависимые выражения и выражения с \w, \b, \d, \s проверяются
+    построчно по декодированному тексту, а найденные в байтах слова в строках
+    с не-ASCII символами перепроверяются по тексту: 'ошибкаtimeout' - одно слово.
+    Совпадения считаются по строкам: строка с правилом учитывается один раз.
+    """
+
+    SEPARATE_RULES = 8
+    KEYWORD_RE = re.compile(r'\\b(\w+)\\b')
+    WORD_RE = re.compile(rb'\w+')
+    UNICODE_CLASS_RE = re.compile(r'\\[wWbBdDsS]')
+    # Все байты, кроме [A-Za-z0-9_], заменяются пробелом - после split остаются слова,
+    # границы которых совпадают с \b байтовых выражений
+    WORD_BYTES = bytes(byte if chr(byte).isalnum() and byte < 128 or byte == ord('_') else ord(' ')
+                       for byte in range(256))
+
+    def __init__(self, filters):
+        # нижний регистр -> {слово: [(правило, выражение, проверка по тексту)]}
+        keywords = {False: {}, True: {}}
+        literals = {False: {}, True: {}}
+        self.separate = []  # (правило, выражение, проверка по тексту, в нижнем регистре)
+        self.regexes = []
+        self.text_regexes = []  # проверяются по декодированным строкам
+        for name, (pattern, flags) in filters.items():
+            lowered = bool(flags & re.IGNORECASE)
+            word = self.KEYWORD_RE.fullmatch(pattern)
+            if word and word.group(1).isascii() and not flags & ~re.IGNORECASE:
+                text = word.group(1).encode()
+                text = text.lower() if lowered else text
+                # Пустая группа: findall вернет общий b'' вместо копии каждой строки
+                rule = (name, re.compile(rb'\b' + text + rb'\b[^\n]*()'), re.compile(pattern, flags))
+                keywords[lowered].setdefault(text, []).append(rule)
+            elif pattern and re.escape(pattern) == pattern and lowered and not pattern.isascii():
+                # bytes.lower() меняет регистр только у ASCII - такие подстроки ищем в тексте
+                self.text_regexes.append((name, re.compile(pattern, flags)))
+            elif pattern and re.escape(pattern) == pattern and not flags & ~re.IGNORECASE:
+                text = pattern.encode('utf-8')
+                text = text.lower() if lowered else text
+                rule = (name, re.compile(re.escape(text) + rb'[^\n]*()'), None)
+                if self.WORD_RE.fullmatch(text):
+                    literals[lowered].setdefault(text, []).append(rule)
+                else:
+                    self.separate.append((*rule, lowered))
+            elif flags & (re.ASCII | re.LOCALE) or (pattern.isascii() and not lowered
+                                                     and not self.UNICODE_CLASS_RE.search(pattern)):
+                self.regexes.append((name, re.compile(pattern.encode('utf-8'), flags)))
+            else:
+                self.text_regexes.append((name, re.compile(pattern, flags)))
+
+        self.words = {}  # нижний регистр -> (слова-правила, дерево подстрок, closure)
+        for lowered in (False, True):
+            rules = [rule for words in (keywords[lowered], literals[lowered])
+                     for rules in words.values() for rule in rules]
+            if len(rules) <= self.SEPARATE_RULES:
+                self.separate += [(*rule, lowered) for rule in rules]
+                continue
+            trie = closure = None
+            if literals[lowered]:
+                # В каждой позиции дерево находит самую длинную подстроку,
+                # правила более коротких подстрок с того же места берутся из closure
+                words = literals[lowered]
+                trie = re.compile(b'(?=(' + _trie_pattern(words) + b'))')
+                closure = {word: [rule for other, rules in words.items() if word.startswith(other)
+                                  for rule in rules]
+                           for word in words}
+            self.words[lowered] = (keywords[lowered], trie, closure)
+
+        self.lowercase = any(rule[3] for rule in self.separate) or True in self.words
+        self.candidates = self._candidates(self.regexes)
+        self.text_candidates = self._candidates(self.text_regexes)
+
+    @staticmethod
+    def _candidates(regexes):
+        """Общая альтернатива правил для поиска строк-кандидатов или None"""
+        if not regexes:
+            return None
+        parts = []
+        for _, regex in regexes:
+            flags = 'i' if regex.flags & re.IGNORECASE else ''
+            flags += 's' if regex.flags & re.DOTALL else ''
+            flags += 'x' if regex.flags & re.VERBOSE else ''
+            if isinstance(regex.pattern, bytes):
+                parts.append(f'(?{flags}:'.encode() + regex.pattern + b')')
+            else:
+                parts.append(f'(?{flags}:' + regex.pattern + ')')
+        try:
+            return re.compile((b'|' if isinstance(parts[0], bytes) else '|').join(parts), re.MULTILINE)
+        except re.error:
+            return None  # например, одинаковые имена групп - проверяем каждую строку
+
+    def scan(self, chunk, report, first_line):
+        """Совпадения всех правил в блоке целых строк -> report.counts и report.matches"""
+        lowered_chunk = chunk.lower() if self.lowercase else None
+        found = {}  # правило -> (выражение, проверка, в нижнем регистре) для встреченных в блоке
+        for lowered, (keywords, trie, closure) in self.words.items():
+            haystack = lowered_chunk if lowered else chunk
+            vocabulary = set(haystack.translate(self.WORD_BYTES).split())
+            for word in keywords.keys() & vocabulary:
+                found.update((name, (regex, check, lowered)) for name, regex, check in keywords[word])
+            if trie is not None:
+                for word in set(trie.findall(b' '.join(vocabulary))):
+                    found.update((name, (regex, check, lowered)) for name, regex, check in closure[word])
+
+        # В блоке из одного ASCII байтовые границы слов совпадают с текстовыми
+        verify = not chunk.isascii()
+        for name, regex, check, lowered in self.separate + [(name, *rule) for name, rule in found.items()]:
+            self._scan_rule(name, regex, check if verify else None,
+                            lowered_chunk if lowered else chunk, chunk, report, first_line)
+
+        if b'\r\n' in chunk and (self.regexes or self.text_regexes):
+            # Как при чтении в текстовом режиме: $ стоит перед переводом строки, а не перед \r
+            chunk = chunk.replace(b'\r\n', b'\n')
+        if self.regexes:
+            self._scan_regexes(chunk, self.regexes, self.candidates, report, first_line)
+        if self.text_regexes:
+            text = chunk.decode('utf-8', errors='replace')
+            self._scan_regexes(text, self.text_regexes, self.text_candidates, report, first_line)
+
+    @staticmethod
+    def _scan_rule(name, regex, check, haystack, chunk, report, first_line):
+        matches = report.matches[name]
+        if check is None and report.max_matches is not None and len(matches) >= report.max_matches:
+            report.counts[name] += len(regex.findall(haystack))
+            return
+        # Номер строки считается только для сохраняемых совпадений
+        line, pos = first_line, 0
+        for match in regex.finditer(haystack):
+            start = haystack.rfind(b'\n', 0, match.start()) + 1
+            text = chunk[start:match.end()]
+            # Границы слова у не-ASCII букв видит только выражение над str
+            if check is not None and not text.isascii() and not check.search(_decode(text)):
+                continue
+            report.counts[name] += 1
+            if report.max_matches is not None and len(matches) >= report.max_matches:
+                continue
+            line += chunk.count(b'\n', pos, start)
+            pos = start
+            matches.append((line + 1, _decode(text)))
+
+    @staticmethod
+    def _scan_regexes(chunk, regexes, candidates, report, first_line):
+        """Построчная проверка выражений в блоке байт или в декодированном тексте"""
+        newline, carriage = (b'\n', b'\r') if isinstance(chunk, bytes) else ('\n', '\r')
+        line, pos = first_line + 1, 0
+        position = 0
+        while position < len(chunk):
+            if candidates is not None:
+                match = candidates.search(chunk, position)
+                if match is None:
+                    break
+                position = match.start()
+            start = chunk.rfind(newline, 0, position) + 1
+            end = chunk.find(newline, position)
+            end = len(chunk) if end < 0 else end
+            text = chunk[start:end]
+            if text.endswith(carriage):
+                text = text[:-1]
+            for name, regex in regexes:
+                if not regex.search(text):
+                    continue
+                report.counts[name] += 1
+                matches = report.matches[name]
+                if report.max_matches is None or len(matches) < report.max_matches:
+                    line += chunk.count(newline, pos, start)
+                    pos = start
+                    matches.append((line, _decode(text) if newline == b'\n' else text))
+            position = end + 1
+
+
+# Сигнатуры сжатых форматов в начале файла
+COMPRESSION_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+
+def detect_compression(path):
+    """Формат сжатия по первым байтам файла или None для обычного текста"""
+    with open(path, 'rb') as file:
+        head = file.read(6)
+    for magic, kind in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def open_log(path):
+    """Бинарный поток лога; gzip, bz2 и xz распаковываются на лету
+
+    Для zstd нужен пакет zstandard - он не обязателен для остального модуля.
+    """
+    kind = detect_compression(path)
+    if kind == 'gzip':
+        return gzip.open(path, 'rb')
+    if kind == 'bz2':
+        return bz2.open(path, 'rb')
+    if kind == 'xz':
+        return lzma.open(path, 'rb')
+    if kind == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для чтения .zst установите пакет zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Блоки файла по chunk_size байт, каждый заканчивается на границе строки
+
+    Сжатые файлы распаковываются потоком (см. open_log).
+    """
+    with open_log(path) as file:
+        rest = b''
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            end = data.rfind(b'\n') + 1
+            if not end:
+                rest += data
+                continue
+            yield rest + data[:end]
+            rest = data[end:]
+        if rest:
+            yield rest
+
+
+def iter_log_lines(path, chunk_size=CHUNK_SIZE):
+    """Строки лога по одной, без чтения всего файла в память"""
+    for chunk in iter_chunks(path, chunk_size):
+        yield from chunk.decode('utf-8', errors='replace').splitlines()
+
+
+def _decode(line):
+    return line.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def _without_newline(data):
+    """Блок без завершающего перевода строки (но с пустыми строками перед ним)"""
+    return data[:-1] if data.endswith(b'\n') else data
+
+
+def scan_chunk(chunk, report, rules):
+    """Учет одного блока, начинающегося с начала строки"""
+    first_line = report.lines
+    report.bytes += len(chunk)
+    report.lines += chunk.count(b'\n') + (not chunk.endswith(b'\n'))
+
+    for level in LEVELS:
+        tag = f"[{level}]".encode()
+        report.levels[level] += chunk.count(b'\n' + tag) + chunk.startswith(tag)
+
+    rules.scan(chunk, report, first_line)
+
+    if report.tail.maxlen:
+        last = _without_newline(chunk).rsplit(b'\n', report.tail.maxlen)
+        report.tail.extend(_decode(line) for line in last[-report.tail.maxlen:])
+
+
+def split_ranges(path, parts):
+    """Деление файла на parts диапазонов байт, выровненных по началу строки"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as file:
+        for n in range(1, parts):
+            position = max(size * n // parts, bounds[-1])
+            file.seek(position)
+            file.readline()  # до конца строки, в которую попала граница
+            if file.tell() >= size:
+                break
+            bounds.append(file.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def scan_range(path, start, end, filters=None, tail=3, max_matches=10_000, chunk_size=CHUNK_SIZE):
+    """Проход по диапазону байт через mmap; номера строк - от начала диапазона"""
+    filters = DEFAULT_FILTERS if filters is None else filters
+    report = LogReport(filters, tail, max_matches)
+    rules = RuleSet(filters)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < end:
+            stop = min(position + chunk_size, end)
+            if stop < end:
+                newline = data.rfind(b'\n', position, stop)
+                if newline < 0:
+                    newline = data.find(b'\n', stop, end)
+                stop = end if newline < 0 else newline + 1
+            started = time.perf_counter()
+            chunk = data[position:stop]
+            report.read_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            scan_chunk(chunk, report, rules)
+            report.scan_seconds += time.perf_counter() - started
+            position = stop
+    return report
+
+
+def _scan_range_args(args):
+    return scan_range(*args)
+
+
+GZIP_MEMBER_MAGIC = b'\x1f\x8b\x08'
+
+
+def split_gzip_members(path, parts):
+    """Деление gzip-файла из нескольких членов (cat a.gz b.gz, bgzip) на диапазоны
+
+    Границы ставятся на сигнатуры заголовка члена. Сигнатура может случайно
+    встретиться внутри сжатых данных - такой диапазон не распакуется
+    до конца ровно по границе, и scan_log вернется к последовательному чтению.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for n in range(1, parts):
+            position = data.find(GZIP_MEMBER_MAGIC, max(size * n // parts, bounds[-1] + 1))
+            # Зарезервированные биты флагов заголовка всегда нулевые
+            while position >= 0 and data[position + 3] & 0xE0:
+                position = data.find(GZIP_MEMBER_MAGIC, position + 1)
+            if position < 0:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+class _GzipRangeError(Exception):
+    """Диапазон не совпал с границами членов gzip"""
+
+
+def scan_gzip_range(path, start, end, filters=None, tail=3, max_matches=10_000, chunk_size=CHUNK_SIZE):
+    """Распаковка и разбор членов gzip в диапазоне байт [start, end)
+
+    Распакованный текст не обязан начинаться и заканчиваться на границе
+    строки, поэтому первая неполная строка (head) и последняя (rest)
+    возвращаются отдельно и склеиваются с соседями при слиянии.
+    Возвращает (head, report, rest); head равен None, если в диапазоне
+    не было ни одного перевода строки - тогда весь текст в rest.
+    """
+    filters = DEFAULT_FILTERS if filters is None else filters
+    report = LogReport(filters, tail, max_matches)
+    rules = RuleSet(filters)
+    head, rest, pending, pending_size = None, b'', [], 0
+
+    def flush():
+        nonlocal head, rest
+        data = rest + b''.join(pending)
+        pending.clear()
+        if head is None:
+            newline = data.find(b'\n')
+            if newline < 0:
+                rest = data
+                return
+            head, data = data[:newline], data[newline + 1:]
+        cut = data.rfind(b'\n') + 1
+        started = time.perf_counter()
+        if cut:
+            scan_chunk(data[:cut], report, rules)
+        report.scan_seconds += time.perf_counter() - started
+        rest = data[cut:]
+
+    decompressor, member_open = zlib.decompressobj(31), False
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining:
+            started = time.perf_counter()
+            data = file.read(min(1024 * 1024, remaining))
+            remaining -= len(data)
+            while data:
+                try:
+                    output = decompressor.decompress(data)
+                except zlib.error as e:
+                    raise _GzipRangeError(str(e))
+                member_open = not decompressor.eof
+                data = decompressor.unused_data if decompressor.eof else b''
+                if decompressor.eof:
+                    decompressor = zlib.decompressobj(31)
+                pending.append(output)
+                pending_size += len(output)
+            report.read_seconds += time.perf_counter() - started
+            if pending_size >= chunk_size:
+                flush()
+                pending_size = 0
+    if member_open:
+        raise _GzipRangeError("диапазон заканчивается внутри члена gzip")
+    flush()
+    return head, report, rest
+
+
+def _scan_gzip_range_args(args):
+    return scan_gzip_range(*args)
+
+
+def _scan_gzip_parallel(path, report, filters, tail, max_matches, chunk_size, workers):
+    """Параллельная распаковка членов gzip; False, если файл так не делится"""
+    ranges = split_gzip_members(path, workers * 4)
+    if len(ranges) < 2:
+        return False
+    tasks = [(path, start, end, filters, tail, max_matches, chunk_size) for start, end in ranges]
+    rules = RuleSet(filters)
+    carry = b''
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_scan_gzip_range_args, tasks))
+    except _GzipRangeError:
+        return False
+    for head, part, rest in parts:
+        if head is None:
+            carry += rest
+            continue
+        # Строка, разрезанная границей диапазонов
+        scan_chunk(carry + head + b'\n', report, rules)
+        report.merge(part)
+        carry = rest
+    if carry:
+        scan_chunk(carry, report, rules)
+    return True
+
+
+def scan_log(path, filters=None, tail=3, max_matches=10_000, chunk_size=CHUNK_SIZE, workers=1):
+    """Один проход по логу: уровни, фильтры и последние tail строк
+
+    При workers > 1 файл делится на диапазоны по границам строк, которые
+    просматриваются в отдельных процессах; итоги сливаются по порядку
+    диапазонов и совпадают с последовательным проходом. Сжатые файлы
+    (gzip, bz2, xz) читаются потоком; gzip из нескольких членов
+    распаковывается параллельно по членам.
+    """
+    filters = DEFAULT_FILTERS if filters is None else filters
+    report = LogReport(filters, tail, max_matches)
+    size = os.path.getsize(path)
+    kind = detect_compression(path) if size else None
+    if workers > 1 and kind == 'gzip':
+        if _scan_gzip_parallel(path, report, filters, tail, max_matches, chunk_size, workers):
+            return report
+        # Один член или граница не совпала с членом - читаем последовательно
+        report = LogReport(filters, tail, max_matches)
+    elif workers > 1 and kind is None and size > chunk_size:
+        # Несколько диапазонов на процесс - чтобы процессы заканчивали почти одновременно
+        parts = min(workers * 4, -(-size // chunk_size))
+        tasks = [(path, start, end, filters, tail, max_matches, chunk_size)
+                 for start, end in split_ranges(path, parts)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_scan_range_args, tasks):
+                report.merge(part)
+        return report
+
+    rules = RuleSet(filters)
+    chunks = iter_chunks(path, chunk_size)
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        report.read_seconds += time.perf_counter() - started
+        if chunk is None:
+            break
+        started = time.perf_counter()
+        scan_chunk(chunk, report, rules)
+        report.scan_seconds += time.perf_counter() - started
+    return report
+
+
+def read_tail(path, count=3, block_size=64 * 1024):
+    """Последние count строк файла: чтение с конца, а не всего файла"""
+    with open(path, 'rb') as file:
+        file.seek(0, 2)
+        position = file.tell()
+        data = b''
+        while position and _without_newline(data).count(b'\n') < count:
+            step = min(block_size, position)
+            position -= step
+            file.seek(position)
+            data = file.read(step) + data
+    lines = _without_newline(data).split(b'\n') if data else []
+    return [_decode(line) for line in lines[-count:]]
+
+
+TOKEN_RE = re.compile(r'\w+')
+LEVEL_RE = re.compile(rb'\[(' + b'|'.join(level.encode() for level in LEVELS) + rb')\]')
+
+
+class LogIndex:
+    """Индекс рядом с логом (app.log.idx): смещения строк с уровнями и слова -> строки
+
+    Индекс хранится в SQLite и дополняется только новыми байтами лога
+    (update), поэтому дописывание как в шаге 8 не требует полного пересчета.
+    Если лог перезаписан или обрезан (не совпало начало файла или он стал
+    короче), индекс строится заново. Запросы читают только нужные строки
+    через seek по сохраненным смещениям.
+    """
+
+    FINGERPRINT_BYTES = 256
+
+    def __init__(self, log_path, index_path=None, chunk_size=CHUNK_SIZE):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + '.idx'
+        self.chunk_size = chunk_size
+        self.conn = sqlite3.connect(self.index_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE IF NOT EXISTS lines (
+                line INTEGER PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                level TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_lines_level ON lines (level, line);
+            CREATE TABLE IF NOT EXISTS tokens (
+                token TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                PRIMARY KEY (token, line)
+            ) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_meta(self, **values):
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+
+    def _reset(self):
+        for table in ('meta', 'lines', 'tokens'):
+            self.conn.execute(f"DELETE FROM {table}")
+
+    def update(self):
+        """Дописать в индекс новые строки лога; возвращает число проиндексированных строк"""
+        with open(self.log_path, 'rb') as file:
+            fingerprint = file.read(self.FINGERPRINT_BYTES)
+            size = os.fstat(file.fileno()).st_size
+            stored = self._meta('fingerprint', b'')
+            offset = self._meta('indexed_bytes', 0)
+            if size < offset or fingerprint[:len(stored)] != stored:
+                self._reset()
+                offset = 0
+            line = self._meta('lines', 0)
+
+            # Последняя строка без перевода строки могла дописаться - индексируем ее заново
+            if self._meta('partial', 0):
+                offset = self.conn.execute("SELECT offset FROM lines WHERE line = ?", (line,)).fetchone()[0]
+                self.conn.execute("DELETE FROM lines WHERE line = ?", (line,))
+                self.conn.execute("DELETE FROM tokens WHERE line = ?", (line,))
+                line -= 1
+
+            added = 0
+            partial = False
+            file.seek(offset)
+            rest = b''
+            while True:
+                data = file.read(self.chunk_size)
+                if not data:
+                    break
+                data = rest + data
+                chunk_lines = data.split(b'\n')
+                rest = chunk_lines.pop()
+                line, offset = self._add_lines(chunk_lines, line, offset, newline=True)
+                added += len(chunk_lines)
+            if rest:
+                line, offset = self._add_lines([rest], line, offset, newline=False)
+                added += 1
+                partial = True
+
+        self._set_meta(fingerprint=fingerprint, indexed_bytes=offset, lines=line, partial=int(partial))
+        self.conn.commit()
+        return added
+
+    def _add_lines(self, chunk_lines, line, offset, newline):
+        rows, tokens = [], []
+        for raw in chunk_lines:
+            line += 1
+            match = LEVEL_RE.match(raw)
+            rows.append((line, offset, match.group(1).decode() if match else None))
+            tokens.extend((token, line) for token in set(TOKEN_RE.findall(_decode(raw).lower())))
+            offset += len(raw) + newline
+        self.conn.executemany("INSERT INTO lines (line, offset, level) VALUES (?, ?, ?)", rows)
+        self.conn.executemany("INSERT OR IGNORE INTO tokens (token, line) VALUES (?, ?)", tokens)
+        return line, offset
+
+    def query(self, level=None, keyword=None, limit=None):
+        """Строки (номер, текст) с уровнем level и/или словом keyword
+
+        keyword ищется как целое слово без учета регистра; "timeout*"
+        ищет слова с этим началом.
+        """
+        where, params = [], []
+        if level is not None:
+            where.append("l.level = ?")
+            params.append(level)
+        if keyword is not None:
+            keyword = keyword.lower()
+            if keyword.endswith('*'):
+                prefix = keyword[:-1]
+                where.append("l.line IN (SELECT line FROM tokens WHERE token >= ? AND token < ?)")
+                params += [prefix, prefix + '\U0010ffff']
+            else:
+                where.append("l.line IN (SELECT line FROM tokens WHERE token = ?)")
+                params.append(keyword)
+        sql = "SELECT l.line, l.offset FROM lines l"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY l.line"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        result = []
+        with open(self.log_path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return result
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for line, offset in self.conn.execute(sql, params):
+                    end = data.find(b'\n', offset)
+                    result.append((line, _decode(data[offset:end if end >= 0 else len(data)])))
+        return result
+
+    def level_counts(self):
+        """Число строк каждого уровня без чтения лога"""
+        counts = dict.fromkeys(LEVELS, 0)
+        counts.update(self.conn.execute(
+            "SELECT level, COUNT(*) FROM lines WHERE level IS NOT NULL GROUP BY level"))
+        return counts
+
+
+# Строка лога: [необязательное время] [LEVEL] сообщение
+LINE_RE = re.compile(
+    rb'^(?:(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d)\S*[ \t]+)?'
+    rb'(?:\[(' + b'|'.join(level.encode() for level in LEVELS) + rb')\][ \t]?)?'
+    rb'([^\n]*)$', re.MULTILINE)
+NUMBER_RE = re.compile(rb'\d+')
+
+
+class LogColumns:
+    """Разобранный лог в колонках: по элементу массива на строку
+
+    levels - код уровня (0 - без уровня, иначе 1 + индекс в LEVELS),
+    offsets - смещение строки в файле, times - время в секундах эпохи
+    (-1, если в строке его нет или дата невозможна), templates - номер шаблона сообщения.
+    Шаблон - сообщение с числами, замененными на <N>; одинаковые шаблоны
+    хранятся один раз. Уровень берется только из тега в начале строки,
+    поэтому "ERROR" внутри текста сообщения уровнем не считается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.levels = array('B')
+        self.offsets = array('Q')
+        self.times = array('q')
+        self.templates = array('I')
+        self.template_texts = []
+        self._template_ids = {}
+        self._last_stamp = (None, -1)  # строки идут по времени - одно и то же время подряд
+
+    def __len__(self):
+        return len(self.levels)
+
+    def _intern(self, message):
+        template = NUMBER_RE.sub(b'<N>', message)
+        template_id = self._template_ids.get(template)
+        if template_id is None:
+            template_id = self._template_ids[template] = len(self.template_texts)
+            self.template_texts.append(_decode(template))
+        return template_id
+
+    @staticmethod
+    def _timestamp(stamp):
+        """Время строки в секундах или -1, если такой даты нет (2024-02-30)"""
+        try:
+            return int(datetime.fromisoformat(stamp.decode()).timestamp())
+        except (ValueError, OverflowError):
+            return -1
+
+    def _add_chunk(self, chunk, offset):
+        stop = len(chunk) - chunk.endswith(b'\n')  # пустое совпадение за последним переводом строки - не строка
+        for match in LINE_RE.finditer(chunk):
+            if match.start() > stop:
+                break
+            stamp, level, message = match.groups()
+            self.offsets.append(offset + match.start())
+            self.levels.append(LEVELS.index(level.decode()) + 1 if level else 0)
+            if stamp is None:
+                self.times.append(-1)
+            else:
+                if stamp != self._last_stamp[0]:
+                    self._last_stamp = (stamp, self._timestamp(stamp))
+                self.times.append(self._last_stamp[1])
+            self.templates.append(self._intern(message.rstrip(b'\r')))
+
+    def memory_bytes(self):
+        """Примерный объем в памяти: массивы плюс тексты шаблонов"""
+        arrays = sum(column.itemsize * len(column)
+                     for column in (self.levels, self.offsets, self.times, self.templates))
+        return arrays + sum(sys.getsizeof(text) for text in self.template_texts)
+
+    def _mask(self, level):
+        code = LEVELS.index(level) + 1
+        return map(code.__eq__, self.levels)
+
+    def count_by_level(self):
+        """Число строк каждого уровня"""
+        return {level: self.levels.count(code) for code, level in enumerate(LEVELS, 1)}
+
+    def top_messages(self, level=None, n=10):
+        """Самые частые шаблоны сообщений (шаблон, число) - всего или для уровня"""
+        ids = self.templates if level is None else compress(self.templates, self._mask(level))
+        return [(self.template_texts[template_id], count) for template_id, count in Counter(ids).most_common(n)]
+
+    def top_messages_by_level(self, n=10):
+        """top_messages для каждого уровня"""
+        counts = Counter(zip(self.levels, self.templates))
+        result = {level: [] for level in LEVELS}
+        for (code, template_id), count in counts.most_common():
+            if code and len(result[LEVELS[code - 1]]) < n:
+                result[LEVELS[code - 1]].append((self.template_texts[template_id], count))
+        return result
+
+    def count_by_time(self, bucket_seconds=60, level=None):
+        """Число строк по интервалам времени: {начало интервала: число}"""
+        times = self.times if level is None else compress(self.times, self._mask(level))
+        counts = Counter(stamp - stamp % bucket_seconds for stamp in times if stamp >= 0)
+        return {datetime.fromtimestamp(start): counts[start] for start in sorted(counts)}
+
+    def lines(self, level=None, template=None, limit=None):
+        """Номера и тексты строк по уровню и/или шаблону - чтение по смещениям"""
+        rows = range(len(self))
+        if level is not None:
+            rows = compress(rows, self._mask(level))
+        if template is not None:
+            template_id = self.template_texts.index(template)
+            rows = (row for row in rows if self.templates[row] == template_id)
+        result = []
+        with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for row in rows:
+                if limit is not None and len(result) >= limit:
+                    break
+                start = self.offsets[row]
+                end = data.find(b'\n', start)
+                result.append((row + 1, _decode(data[start:end if end >= 0 else len(data)])))
+        return result
+
+
+def parse_columns(path, chunk_size=CHUNK_SIZE):
+    """Разбор несжатого лога в LogColumns за один проход"""
+    columns = LogColumns(path)
+    offset = 0
+    with open(path, 'rb') as file:
+        rest = b''
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            if end:
+                columns._add_chunk(data[:end], offset)
+                offset += end
+            rest = data[end:]
+        if rest:
+            columns._add_chunk(rest, offset)
+    return columns
+
+
+class _InotifyWaiter:
+    """Ожидание изменений в каталоге лога через inotify (Linux) - без опроса"""
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+    def __init__(self, directory, max_interval):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.max_interval = max_interval
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch")
+
+    def wait(self):
+        # max_interval - страховка на случай пропущенного события (например, сетевой диск)
+        ready, _, _ = select.select([self.fd], [], [], self.max_interval)
+        if ready:
+            try:
+                while os.read(self.fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def activity(self):
+        pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWaiter:
+    """Опрос с растущим интервалом: часто после записи, редко в простое"""
+
+    def __init__(self, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+    def wait(self):
+        time.sleep(self.interval)
+        self.interval = min(self.interval * 2, self.max_interval)
+
+    def activity(self):
+        self.interval = self.min_interval
+
+    def close(self):
+        pass
+
+
+class LogFollower:
+    """Слежение за растущим логом как tail -F
+
+    Читаются только новые байты после сохраненного смещения. Счетчики
+    уровней и фильтров и последние tail строк (report) обновляются на ходу.
+    Ротация (файл по этому пути заменен) и обрезка (файл стал короче
+    смещения) обнаруживаются и обрабатываются: новый файл читается
+    с начала, счетчики продолжают накапливаться. Строка без перевода
+    строки ждет его и не учитывается раньше времени.
+
+    На Linux изменения ждутся через inotify, в остальных системах - опросом
+    с интервалом от min_interval до max_interval секунд.
+    """
+
+    def __init__(self, path, filters=None, tail=3, from_start=True, chunk_size=CHUNK_SIZE,
+                 min_interval=0.0005, max_interval=0.25, use_inotify=None):
+        self.path = path
+        self.report = LogReport(filters, tail, max_matches=0)
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.rotations = 0
+        self.truncations = 0
+        self._rules = RuleSet(DEFAULT_FILTERS if filters is None else filters)
+        self._file = None
+        self._rest = b''
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux')
+        try:
+            if not use_inotify:
+                raise OSError("inotify отключен")
+            directory = os.path.dirname(os.path.abspath(path))
+            self._waiter = _InotifyWaiter(directory, max_interval)
+        except (OSError, AttributeError):
+            self._waiter = _PollingWaiter(min_interval, max_interval)
+        if self._open() and not from_start:
+            self._file.seek(0, 2)
+            self.offset = self._file.tell()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._file = None
+            return False
+        self.offset = 0
+        return True
+
+    def _feed(self, data):
+        """Учет прочитанных байт; возвращает новые полные строки"""
+        self.offset += len(data)
+        data = self._rest + data
+        end = data.rfind(b'\n') + 1
+        self._rest = data[end:]
+        if not end:
+            return []
+        complete = data[:end]
+        scan_chunk(complete, self.report, self._rules)
+        return [_decode(line) for line in _without_newline(complete).split(b'\n')]
+
+    def _read_new(self):
+        lines = []
+        while True:
+            data = self._file.read(self.chunk_size)
+            if not data:
+                return lines
+            lines += self._feed(data)
+
+    def poll(self):
+        """Одна проверка файла без ожидания; возвращает новые строки"""
+        if self._file is None and not self._open():
+            return []
+        lines = self._read_new()
+
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return lines  # старый файл уже переименован, новый еще не создан
+        opened = os.fstat(self._file.fileno())
+        if (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev):
+            # Ротация: хвост старого файла дочитан, недописанная строка считается законченной
+            if self._rest:
+                lines += self._feed(b'\n')
+            self._file.close()
+            self.rotations += 1
+            if self._open():
+                lines += self._read_new()
+        elif current.st_size < self.offset:
+            self._rest = b''
+            self._file.seek(0)
+            self.offset = 0
+            self.truncations += 1
+            lines += self._read_new()
+        return lines
+
+    def follow(self, on_lines=None, stop=None, duration=None):
+        """Слежение до stop.set() или истечения duration секунд
+
+        on_lines(строки) вызывается сразу после появления новых строк.
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        while not (stop is not None and stop.is_set()):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            lines = self.poll()
+            if lines:
+                self._waiter.activity()
+                if on_lines is not None:
+                    on_lines(lines)
+            else:
+                self._waiter.wait()
+
+    def close(self):
+        self._waiter.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class Replace:
+    """Этап конвейера: замена подстроки"""
+
+    def __init__(self, old, new):
+        if '\n' in old or '\n' in new:
+            raise ValueError("Замена работает внутри строки лога: перевод строки недопустим")
+        self.old = old
+        self.new = new
+        self._regex = re.compile(re.escape(old))
+
+    def may_match(self, chunk):
+        return self.old in chunk
+
+    def line_starts(self, chunk):
+        """Начала строк блока, в которых есть заменяемая подстрока"""
+        return {chunk.rfind('\n', 0, match.start()) + 1 for match in self._regex.finditer(chunk)}
+
+    def apply(self, line):
+        return line.replace(self.old, self.new)
+
+
+class RegexSub:
+    """Этап конвейера: замена по регулярному выражению (внутри строки)"""
+
+    def __init__(self, pattern, repl, flags=0):
+        self.regex = re.compile(pattern, flags)
+        self.repl = repl
+
+    def may_match(self, chunk):
+        # Шаблон с ^, $ или \s по блоку ведет себя иначе, чем по строке - проверяем каждую строку
+        return True
+
+    def apply(self, line):
+        return self.regex.sub(self.repl, line)
+
+
+class Filter:
+    """Этап конвейера: оставить (keep=True) или убрать строки с совпадением"""
+
+    def __init__(self, pattern, keep=True, flags=0):
+        self.regex = re.compile(pattern, flags)
+        self.keep = keep
+
+    def may_match(self, chunk):
+        return True
+
+    def apply(self, line):
+        return line if (self.regex.search(line) is not None) == self.keep else None
+
+
+class TransformResult:
+    """Итог преобразования: счетчики и список изменений (номер, было, стало)
+
+    В diff попадает не больше max_diff изменений; для удаленных строк
+    "стало" равно None.
+    """
+
+    def __init__(self, max_diff=10_000):
+        self.lines = 0
+        self.changed = 0
+        self.dropped = 0
+        self.diff = []
+        self.max_diff = max_diff
+
+    def record(self, line_no, before, after):
+        if after is None:
+            self.dropped += 1
+        else:
+            self.changed += 1
+        if self.max_diff is None or len(self.diff) < self.max_diff:
+            self.diff.append((line_no, before, after))
+
+
+def _apply_stages(stages, line):
+    for stage in stages:
+        line = stage.apply(line)
+        if line is None:
+            break
+    return line
+
+
+def _transform_chunk(text, stages, result):
+    """Преобразование блока целых строк; возвращает новый текст"""
+    first_line = result.lines
+    ends_with_newline = text.endswith('\n')
+    result.lines += text.count('\n') + (bool(text) and not ends_with_newline)
+
+    # Этап может создать совпадение для следующего (Replace('a', 'b'), затем
+    # Replace('bc', 'X') в 'ac'), поэтому отбрасываются только этапы до первого
+    # встреченного в блоке - они не изменят ни одной строки
+    first = next((index for index, stage in enumerate(stages) if stage.may_match(text)), None)
+    if first is None:
+        return text
+    active = stages[first:]
+
+    if all(isinstance(stage, Replace) for stage in active):
+        # Только замены подстрок: обрабатываются лишь строки с совпадением,
+        # остальной текст блока копируется срезами
+        # line_no - номер строки, в которой стоит позиция previous
+        pieces, previous, line_no = [], 0, first_line + 1
+        for start in sorted(set().union(*(stage.line_starts(text) for stage in active))):
+            end = text.find('\n', start)
+            end = len(text) if end < 0 else end
+            line_no += text.count('\n', previous, start)
+            before = text[start:end]
+            after = _apply_stages(active, before)
+            if after != before:
+                result.record(line_no, before, after)
+            pieces.append(text[previous:start])
+            pieces.append(after)
+            previous = end
+        pieces.append(text[previous:])
+        return ''.join(pieces)
+
+    lines = text.split('\n')
+    if ends_with_newline:
+        lines.pop()
+    output = []
+    for number, line in enumerate(lines, first_line + 1):
+        new = _apply_stages(active, line)
+        if new != line:
+            result.record(number, line, new)
+        if new is not None:
+            output.append(new)
+    if not output:
+        return ''
+    return '\n'.join(output) + ('\n' if ends_with_newline else '')
+
+
+def transform_log(source, dest, stages, chunk_size=CHUNK_SIZE, max_diff=10_000):
+    """Потоковое преобразование лога цепочкой этапов с атомарной записью
+
+    Файл читается блоками, обрезанными по границе строки, поэтому шаблон
+    не разрывается границей блока. Результат пишется во временный файл
+    в каталоге dest и переименовывается в dest только после успешного
+    окончания - dest может совпадать с source. Список изменений собирается
+    в том же проходе.
+    """
+    result = TransformResult(max_diff)
+    directory = os.path.dirname(os.path.abspath(dest))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(dest), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as out:
+            for chunk in iter_chunks(source, chunk_size):
+                # surrogateescape: любые байты, даже не UTF-8, переживают преобразование без потерь
+                text = _transform_chunk(chunk.decode('utf-8', errors='surrogateescape'), stages, result)
+                out.write(text.encode('utf-8', errors='surrogateescape'))
+            out.flush()
+            os.fsync(out.fileno())
+        if os.path.exists(source):
+            os.chmod(temp_path, os.stat(source).st_mode & 0o777)
+        os.replace(temp_path, dest)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return result
+
 
 def main():
     # 1-2. Создание файла app.log
@@ -22,29 +1231,27 @@ def main():
     
     # 3. Все строки лога
     print("=== 3. Все строки лога ===")
-    with open('app.log', 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-        for i, line in enumerate(lines, 1):
-            print(f"{i:2d}. {line.strip()}")
+    for i, line in enumerate(iter_log_lines('app.log'), 1):
+        print(f"{i:2d}. {line.strip()}")
+    
+    # 4-7 считаются за один проход по файлу
+    report = scan_log('app.log')
     
     # 4. Строки с ERROR
     print("\n=== 4. Строки с ERROR ===")
-    error_lines = [line.strip() for line in lines if 'ERROR' in line]
-    for line in error_lines:
-        print(line)
+    for _, line in report.matches['error']:
+        print(line.strip())
     
     # 5. Строки с timeout (регистронезависимо)
     print("\n=== 5. Строки с timeout ===")
-    timeout_lines = [line.strip() for line in lines if re.search('timeout', line, re.IGNORECASE)]
-    for line in timeout_lines:
-        print(line)
+    for _, line in report.matches['timeout']:
+        print(line.strip())
     
     # 6. Общее количество строк
-    print(f"\n=== 6. Общее количество строк: {len(lines)} ===")
+    print(f"\n=== 6. Общее количество строк: {report.lines} ===")
     
     # 7. Количество WARNING
-    warning_count = sum(1 for line in lines if 'WARNING' in line)
-    print(f"=== 7. Количество строк с WARNING: {warning_count} ===")
+    print(f"=== 7. Количество строк с WARNING: {report.counts['warning']} ===")
     
     # 8. Добавление новой строки
     with open('app.log', 'a', encoding='utf-8') as file:
@@ -53,33 +1260,20 @@ def main():
     
     # 9. Последние 3 строки
     print("\n=== 9. Последние 3 строки ===")
-    with open('app.log', 'r', encoding='utf-8') as file:
-        all_lines = file.readlines()
-        for line in all_lines[-3:]:
-            print(line.strip())
+    for line in read_tail('app.log', 3):
+        print(line.strip())
     
     # 10. Замена logged на connected
     print("\n=== 10. Замена 'logged' на 'connected' ===")
-    with open('app.log', 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    fixed_content = content.replace('logged', 'connected')
-    
-    with open('app_fixed.log', 'w', encoding='utf-8') as file:
-        file.write(fixed_content)
+    result = transform_log('app.log', 'app_fixed.log', [Replace('logged', 'connected')])
     
     print("✓ Файл app_fixed.log создан")
     
-    # Показать изменения
+    # Показать изменения (собраны во время замены)
     print("\nИзменения:")
-    with open('app.log', 'r', encoding='utf-8') as f1, open('app_fixed.log', 'r', encoding='utf-8') as f2:
-        orig_lines = f1.readlines()
-        fixed_lines = f2.readlines()
-        
-        for orig, fixed in zip(orig_lines, fixed_lines):
-            if orig != fixed:
-                print(f"Было: {orig.strip()}")
-                print(f"Стало: {fixed.strip()}\n")
+    for _, before, after in result.diff:
+        print(f"Было: {before.strip()}")
+        print(f"Стало: {after.strip()}\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
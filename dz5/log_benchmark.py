@@ -0,0 +1,478 @@
+"""
+Бенчмарки анализатора логов (dz5/app.log.py)
+"""
+
+import argparse
+import bz2
+import collections
+import gzip
+import importlib.util
+import lzma
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Имя файла с точкой нельзя импортировать обычным import. Модуль
+# регистрируется в sys.modules, чтобы его функции передавались в процессы.
+_spec = importlib.util.spec_from_file_location(
+    'app_log', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.log.py'))
+app_log = sys.modules['app_log'] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(app_log)
+
+MESSAGES = [
+    "[INFO] User logged in",
+    "[ERROR] Connection timeout",
+    "[DEBUG] Starting calculation",
+    "[WARNING] Disk space low",
+    "[INFO] Database connection established",
+    "[ERROR] File not found",
+    "[DEBUG] Processing request ID {n}",
+    "[WARNING] Memory usage high",
+    "[INFO] Backup completed successfully",
+    "[ERROR] Authentication failed",
+    "[DEBUG] Cache cleared",
+    "[WARNING] High CPU usage",
+    "[INFO] User session started",
+    "[INFO] GET /api/v1/items/{n} 200 in {ms}ms",
+    "[DEBUG] Upstream request TIMEOUT after {ms}ms, retrying",
+]
+
+
+def generate_log(path, size_mb=256, seed=42):
+    """Лог из сообщений как в app.log, примерно size_mb мегабайт"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        while written < target:
+            block = "".join(
+                rng.choice(MESSAGES).format(n=rng.randrange(10**6), ms=rng.randrange(5000)) + "\n"
+                for _ in range(10_000))
+            file.write(block)
+            written += len(block.encode('utf-8'))
+    return os.path.getsize(path)
+
+
+def legacy_scan(path):
+    """Шаги 3-7 и 9 в исходном виде: readlines, отдельный список на каждый вопрос"""
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    error_lines = [line.strip() for line in lines if 'ERROR' in line]
+    timeout_lines = [line.strip() for line in lines if re.search('timeout', line, re.IGNORECASE)]
+    warning_count = sum(1 for line in lines if 'WARNING' in line)
+    with open(path, 'r', encoding='utf-8') as file:
+        tail = [line.strip() for line in file.readlines()[-3:]]
+    return len(lines), len(error_lines), len(timeout_lines), warning_count, tail
+
+
+def percentile(values, p):
+    """Перцентиль p (0-100) по отсортированной копии значений"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _same_report(a, b):
+    return ((a.lines, a.bytes, a.levels, a.counts, a.matches, list(a.tail))
+            == (b.lines, b.bytes, b.levels, b.counts, b.matches, list(b.tail)))
+
+
+def benchmark_streaming(path):
+    """Исходный скрипт против однопроходного потокового движка, ГБ/с"""
+    size = os.path.getsize(path)
+
+    start = time.perf_counter()
+    legacy = legacy_scan(path)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = app_log.scan_log(path, max_matches=10_000)
+    streaming_seconds = time.perf_counter() - start
+
+    streaming = (report.lines, report.counts['error'], report.counts['timeout'],
+                 report.counts['warning'], [line.strip() for line in report.tail])
+    results = {
+        'size_gb': round(size / 1e9, 3),
+        'legacy_gb_per_sec': round(size / 1e9 / legacy_seconds, 3),
+        'streaming_gb_per_sec': round(size / 1e9 / streaming_seconds, 3),
+        'speedup': round(legacy_seconds / streaming_seconds, 1),
+        'same_results': legacy == streaming,
+    }
+
+    print("\n" + "=" * 60)
+    print(f"📜 ПОТОКОВЫЙ АНАЛИЗ: лог {results['size_gb']} ГБ")
+    print("=" * 60)
+    print(f"исходный скрипт:  {results['legacy_gb_per_sec']} ГБ/с")
+    print(f"потоковый проход: {results['streaming_gb_per_sec']} ГБ/с (x{results['speedup']})")
+    print(f"результаты совпадают: {'✓' if results['same_results'] else '✗'}")
+    return results
+
+
+def benchmark_parallel(path, workers=None):
+    """Масштабирование по процессам: 1, 2, 4 ... до числа ядер"""
+    cpus = os.cpu_count() or 1
+    workers = workers or sorted({1, *(2 ** n for n in range(1, cpus.bit_length())), cpus})
+    size = os.path.getsize(path)
+
+    serial = None
+    results = {'cpus': cpus, 'runs': []}
+    for count in workers:
+        start = time.perf_counter()
+        report = app_log.scan_log(path, workers=count)
+        seconds = time.perf_counter() - start
+        serial = serial or (report, seconds)
+        results['runs'].append({
+            'workers': count,
+            'gb_per_sec': round(size / 1e9 / seconds, 3),
+            'speedup': round(serial[1] / seconds, 2),
+            'same_results': _same_report(serial[0], report),
+        })
+
+    print("\n" + "=" * 60)
+    print(f"🧵 ПАРАЛЛЕЛЬНЫЙ ПРОХОД: {cpus} ядер")
+    print("=" * 60)
+    for run in results['runs']:
+        print(f"процессов: {run['workers']:3d}  {run['gb_per_sec']} ГБ/с  x{run['speedup']}  "
+              f"совпадает с последовательным: {'✓' if run['same_results'] else '✗'}")
+    return results
+
+
+def benchmark_index(path, keyword='authentication', appended_lines=1_000):
+    """Sidecar-индекс: построение, дописывание и запрос против повторного прохода
+
+    Строки дописываются в копию лога во временном каталоге - файл из --log
+    и его индекс рядом не меняются.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, os.path.basename(path))
+        shutil.copyfile(path, copy)
+        index = app_log.LogIndex(copy)
+        try:
+            start = time.perf_counter()
+            results['indexed_lines'] = index.update()
+            results['build_seconds'] = round(time.perf_counter() - start, 2)
+
+            with open(copy, 'a', encoding='utf-8') as file:
+                file.write("".join(f"[ERROR] Authentication failed for user {n}\n" for n in range(appended_lines)))
+            start = time.perf_counter()
+            results['appended_lines'] = index.update()
+            results['append_update_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+            start = time.perf_counter()
+            hits = index.query(level='ERROR', keyword=keyword)
+            results['index_query_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+            start = time.perf_counter()
+            report = app_log.scan_log(copy, filters={'keyword': (keyword, re.IGNORECASE)}, max_matches=None)
+            results['rescan_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            results['hits'] = len(hits)
+            results['rescan_hits'] = report.counts['keyword']
+            results['index_mb'] = round(os.path.getsize(index.index_path) / 2**20, 1)
+        finally:
+            index.close()
+
+    print("\n" + "=" * 60)
+    print(f"🗂️  ИНДЕКС ЛОГА: {results['indexed_lines']} строк, {results['index_mb']} МБ")
+    print("=" * 60)
+    print(f"построение: {results['build_seconds']} с, дописывание {results['appended_lines']} строк: "
+          f"{results['append_update_ms']} мс")
+    print(f"ERROR + '{keyword}': по индексу {results['index_query_ms']} мс ({results['hits']} строк), "
+          f"повторный проход {results['rescan_ms']} мс")
+    return results
+
+
+def benchmark_follow(events=1_000, pause=0.002, idle_seconds=2.0):
+    """Режим follow: задержка от записи строки до обработки и CPU в простое"""
+    results = {}
+    for mode in ('inotify', 'polling'):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'app.log')
+            open(path, 'w').close()
+            follower = app_log.LogFollower(path, use_inotify=mode == 'inotify')
+            mode = 'inotify' if isinstance(follower._waiter, app_log._InotifyWaiter) else 'polling'
+            latencies = []
+            stop = threading.Event()
+
+            def on_lines(lines):
+                now = time.perf_counter()
+                latencies.extend(now - float(line.rsplit('=', 1)[1]) for line in lines)
+
+            thread = threading.Thread(target=follower.follow, kwargs={'on_lines': on_lines, 'stop': stop})
+            thread.start()
+            try:
+                with open(path, 'a', encoding='utf-8') as file:
+                    for _ in range(events):
+                        file.write(f"[INFO] event sent={time.perf_counter()}\n")
+                        file.flush()
+                        time.sleep(pause)
+                time.sleep(0.5)
+                cpu = time.process_time()
+                time.sleep(idle_seconds)
+                idle_cpu = time.process_time() - cpu
+            finally:
+                stop.set()
+                thread.join()
+                follower.close()
+
+        results[mode] = {
+            'events': len(latencies),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'idle_cpu_percent': round(idle_cpu / idle_seconds * 100, 2),
+            'counted': follower.report.levels['INFO'],
+        }
+
+    print("\n" + "=" * 60)
+    print("👀 РЕЖИМ FOLLOW: задержка обработки новой строки")
+    print("=" * 60)
+    for mode, stats in results.items():
+        print(f"{mode:8s} p50: {stats['p50_ms']} мс  p99: {stats['p99_ms']} мс  "
+              f"CPU в простое: {stats['idle_cpu_percent']}%")
+    return results
+
+
+def legacy_replace(path, dest):
+    """Шаг 10 в исходном виде: read, replace, write и повторное чтение для сравнения"""
+    with open(path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    with open(dest, 'w', encoding='utf-8') as file:
+        file.write(content.replace('logged', 'connected'))
+    with open(path, 'r', encoding='utf-8') as f1, open(dest, 'r', encoding='utf-8') as f2:
+        return sum(1 for orig, fixed in zip(f1.readlines(), f2.readlines()) if orig != fixed)
+
+
+def benchmark_transform(path):
+    """Замена с записью и списком изменений: исходный шаг 10 против потокового конвейера"""
+    size = os.path.getsize(path)
+    dest = path + '.fixed'
+    stages = [app_log.Replace('logged', 'connected')]
+    runs = {
+        'legacy': lambda: legacy_replace(path, dest),
+        'streaming': lambda: app_log.transform_log(path, dest, stages, max_diff=10_000).changed,
+    }
+    results = {}
+    try:
+        for name, run in runs.items():
+            start = time.perf_counter()
+            changed = run()
+            seconds = time.perf_counter() - start
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {
+                'mb_per_sec': round(size / 2**20 / seconds, 1),
+                'peak_memory_mb': round(peak / 2**20, 1),
+                'changed_lines': changed,
+            }
+    finally:
+        if os.path.exists(dest):
+            os.remove(dest)
+
+    print("\n" + "=" * 60)
+    print(f"✏️  ЗАМЕНА В ЛОГЕ: {round(size / 2**20)} МБ")
+    print("=" * 60)
+    for name, stats in results.items():
+        print(f"{name:10s} {stats['mb_per_sec']} МБ/с, пик памяти {stats['peak_memory_mb']} МБ, "
+              f"изменено строк: {stats['changed_lines']}")
+    return results
+
+
+def _compress_samples(path, tmp, size_mb, member_mb=4):
+    """Сжатые копии начала лога: gzip одним членом, gzip по членам, bz2, xz"""
+    with open(path, 'rb') as file:
+        data = file.read(size_mb * 1024 * 1024)
+    data = data[:data.rfind(b'\n') + 1]
+    plain = os.path.join(tmp, 'sample.log')
+    with open(plain, 'wb') as file:
+        file.write(data)
+    samples = {'plain': plain}
+    writers = {
+        'gzip': lambda out: out.write(gzip.compress(data, 6)),
+        'gzip_members': lambda out: [out.write(gzip.compress(data[i:i + member_mb * 2**20], 6))
+                                     for i in range(0, len(data), member_mb * 2**20)],
+        'bz2': lambda out: out.write(bz2.compress(data, 9)),
+        'xz': lambda out: out.write(lzma.compress(data, preset=1)),
+    }
+    for name, write in writers.items():
+        samples[name] = os.path.join(tmp, f'sample.{name}')
+        with open(samples[name], 'wb') as out:
+            write(out)
+    return samples
+
+
+def benchmark_compressed(path, size_mb=64, workers=None):
+    """Чтение сжатых логов: скорость распаковки и разбора отдельно"""
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = _compress_samples(path, tmp, size_mb)
+        reference = app_log.scan_log(samples['plain'])
+        runs = [(name, sample, 1) for name, sample in samples.items()]
+        runs.append(('gzip_members_parallel', samples['gzip_members'], workers))
+        for name, sample, count in runs:
+            start = time.perf_counter()
+            report = app_log.scan_log(sample, workers=count)
+            seconds = time.perf_counter() - start
+            mb = report.bytes / 2**20
+            results[name] = {
+                'workers': count,
+                'ratio': round(report.bytes / os.path.getsize(sample), 1),
+                'total_mb_per_sec': round(mb / seconds, 1),
+                'read_mb_per_sec': round(mb / report.read_seconds, 1) if report.read_seconds else None,
+                'scan_mb_per_sec': round(mb / report.scan_seconds, 1) if report.scan_seconds else None,
+                'same_results': _same_report(reference, report),
+            }
+
+    print("\n" + "=" * 60)
+    print(f"🗜️  СЖАТЫЕ ЛОГИ: {size_mb} МБ текста")
+    print("=" * 60)
+    for name, stats in results.items():
+        print(f"{name:22s} x{stats['ratio']:<5} всего {stats['total_mb_per_sec']} МБ/с, "
+              f"распаковка {stats['read_mb_per_sec']} МБ/с, разбор {stats['scan_mb_per_sec']} МБ/с, "
+              f"совпадает: {'✓' if stats['same_results'] else '✗'}")
+    return results
+
+
+def benchmark_columns(path, max_lines=1_000_000):
+    """Колоночный разбор: память на миллион строк и скорость агрегатов"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = os.path.join(tmp, 'sample.log')
+        with open(path, 'rb') as source, open(sample, 'wb') as out:
+            for _, line in zip(range(max_lines), source):
+                out.write(line)
+
+        start = time.perf_counter()
+        columns = app_log.parse_columns(sample)
+        parse_seconds = time.perf_counter() - start
+
+        with open(sample, encoding='utf-8') as file:
+            lines = file.readlines()
+        strings_bytes = sys.getsizeof(lines) + sum(sys.getsizeof(line) for line in lines)
+
+        start = time.perf_counter()
+        top = columns.top_messages_by_level(5)
+        top_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        naive = {}
+        for level in app_log.LEVELS:
+            naive[level] = collections.Counter(
+                re.sub(r'\d+', '<N>', line.split('] ', 1)[-1].rstrip('\n'))
+                for line in lines if line.startswith(f'[{level}]')).most_common(5)
+        naive_ms = (time.perf_counter() - start) * 1000
+        del lines
+
+    per_million = 1_000_000 / max(len(columns), 1)
+    results = {
+        'lines': len(columns),
+        'templates': len(columns.template_texts),
+        'parse_lines_per_sec': round(len(columns) / parse_seconds),
+        'columns_mb_per_million': round(columns.memory_bytes() * per_million / 2**20, 1),
+        'strings_mb_per_million': round(strings_bytes * per_million / 2**20, 1),
+        'top_by_level_ms': round(top_ms, 1),
+        'naive_top_by_level_ms': round(naive_ms, 1),
+        'same_top': top == naive,
+    }
+
+    print("\n" + "=" * 60)
+    print(f"📊 КОЛОНКИ: {results['lines']} строк, {results['templates']} шаблонов")
+    print("=" * 60)
+    print(f"разбор: {results['parse_lines_per_sec']} строк/с")
+    print(f"память на миллион строк: колонки {results['columns_mb_per_million']} МБ, "
+          f"список строк {results['strings_mb_per_million']} МБ")
+    print(f"топ сообщений по уровням: {results['top_by_level_ms']} мс "
+          f"(по списку строк {results['naive_top_by_level_ms']} мс), совпадает: {'✓' if results['same_top'] else '✗'}")
+    return results
+
+
+def _rule_sets(count, seed=7):
+    """count правил: три из DEFAULT_FILTERS, остальные - случайные слова, которых в логе нет"""
+    rng = random.Random(seed)
+    words = [(pattern, flags) for pattern, flags in app_log.DEFAULT_FILTERS.values()]
+    while len(words) < count:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(5, 10)))
+        words.append((word, re.IGNORECASE if len(words) % 2 else 0))
+    words = words[:count]
+    substrings = {f'rule{i}': rule for i, rule in enumerate(words)}
+    keywords = {f'rule{i}': app_log.keyword(word, bool(flags)) for i, (word, flags) in enumerate(words)}
+    return substrings, keywords
+
+
+def benchmark_rules(path, counts=(3, 10, 50, 100, 500), sample_mb=64):
+    """Фильтры: отдельный проход на каждое правило против RuleSet, от 3 до 500 правил"""
+    chunks = []
+    for chunk in app_log.iter_chunks(path):
+        chunks.append(chunk)
+        if sum(map(len, chunks)) >= sample_mb * 2**20:
+            break
+    size = sum(map(len, chunks))
+
+    def per_rule(filters):
+        # Прежняя схема: для каждого правила свой findall по блоку
+        counts = collections.Counter()
+        compiled = [(name, re.compile(pattern.encode() + rb'[^\n]*()', flags)) for name, (pattern, flags) in filters.items()]
+        for chunk in chunks:
+            for name, regex in compiled:
+                counts[name] += len(regex.findall(chunk))
+        return counts
+
+    def rule_set(filters):
+        report = app_log.LogReport(filters, tail=0, max_matches=0)
+        rules = app_log.RuleSet(filters)
+        for chunk in chunks:
+            app_log.scan_chunk(chunk, report, rules)
+        return report.counts
+
+    def mb_per_sec(scan, filters):
+        start = time.perf_counter()
+        result = scan(filters)
+        return size / 2**20 / (time.perf_counter() - start), result
+
+    results = []
+    print("\n" + "=" * 60)
+    print(f"📊 ПРАВИЛА-ФИЛЬТРЫ: {size / 2**20:.0f} МБ, МБ/с")
+    print("=" * 60)
+    print(f"{'правил':>7} {'вид':>10} {'по правилу':>11} {'RuleSet':>9} {'совпадает':>10}")
+    for count in counts:
+        for kind, filters in zip(('подстроки', 'слова'), _rule_sets(count)):
+            old_speed, old_counts = mb_per_sec(per_rule, filters)
+            new_speed, new_counts = mb_per_sec(rule_set, filters)
+            same = all(old_counts[name] == new_counts[name] for name in filters)
+            results.append({'rules': count, 'kind': kind, 'per_rule_mb_s': round(old_speed, 1),
+                            'rule_set_mb_s': round(new_speed, 1), 'same_counts': same})
+            print(f"{count:>7} {kind:>10} {old_speed:>11.1f} {new_speed:>9.1f} {'✓' if same else '✗':>10}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки анализатора логов")
+    parser.add_argument('--size-mb', type=int, default=1024, help="размер сгенерированного лога")
+    parser.add_argument('--log', help="готовый файл лога вместо сгенерированного")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.log
+        if path is None:
+            path = os.path.join(tmp, 'app.log')
+            generate_log(path, args.size_mb)
+        benchmark_streaming(path)
+        benchmark_parallel(path)
+        benchmark_index(path)
+        benchmark_transform(path)
+        benchmark_compressed(path)
+        benchmark_columns(path)
+        benchmark_rules(path)
+    benchmark_follow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,683 @@
+"""
+Бенчмарки для базы данных блога (dz8/blog_database.py)
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import blog_database as blog
+
+
+class OpenPerCallDatabase(blog.BlogDatabase):
+    """Старое поведение: новое соединение на каждый вызов функции"""
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def percentile(values, p):
+    """Перцентиль p (0-100) по отсортированной копии значений"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure_connection_mode(db, inserts, queries):
+    blog.create_blog_database(db=db)
+    user_id = blog.add_user("bench_user", "bench@example.com", db=db)
+    category_id = blog.add_category("Бенчмарк", db=db)
+    post_id = blog.create_post("Пост для бенчмарка", "Текст", user_id, category_id, db=db)
+
+    start = time.perf_counter()
+    for i in range(inserts):
+        blog.add_comment(f"Комментарий {i}", post_id, user_id, db=db)
+    insert_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(queries):
+        t0 = time.perf_counter()
+        blog.get_users_with_post_count(db=db)
+        latencies.append(time.perf_counter() - t0)
+
+    return {
+        'inserts_per_sec': round(inserts / insert_seconds, 1),
+        'query_p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'query_p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def benchmark_connection_pool(inserts=2000, queries=500):
+    """Сравнение пула соединений с открытием соединения на каждый вызов"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = {
+            'open_per_call': OpenPerCallDatabase(os.path.join(tmp, 'per_call.db'), verbose=False),
+            'pooled': blog.BlogDatabase(os.path.join(tmp, 'pooled.db'), verbose=False),
+        }
+        for name, db in modes.items():
+            try:
+                results[name] = _measure_connection_mode(db, inserts, queries)
+            finally:
+                db.close()
+
+    print("\n" + "=" * 60)
+    print("⏱️  ПУЛ СОЕДИНЕНИЙ ПРОТИВ ОТКРЫТИЯ НА КАЖДЫЙ ВЫЗОВ")
+    print("=" * 60)
+    for name, stats in results.items():
+        print(f"{name:15s} вставок/с: {stats['inserts_per_sec']:>10}  "
+              f"p50: {stats['query_p50_ms']} мс  p99: {stats['query_p99_ms']} мс")
+    return results
+
+
+def benchmark_bulk_ingest(rows=1_000_000, per_call_rows=5000, chunk_size=5000, users=1000, posts=1000):
+    """Сравнение add_comments_many с построчным add_comment
+
+    add_comment меряется и в исходном режиме (соединение на каждый вызов),
+    и через пул. Построчная загрузка меряется на per_call_rows строках и пересчитывается
+    в строки в секунду, иначе миллион строк грузился бы слишком долго.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = blog.BlogDatabase(os.path.join(tmp, 'bulk.db'), verbose=False)
+        try:
+            blog.create_blog_database(db=db)
+            blog.add_users_many(((f"user{i}", f"user{i}@example.com") for i in range(users)), db=db)
+            blog.add_categories_many([("Бенчмарк", None)], db=db)
+            blog.create_posts_many(((f"Пост {i}", "Текст", i % users + 1, 1) for i in range(posts)), db=db)
+
+            # Исходные функции: новое соединение на каждый вызов
+            old_db = OpenPerCallDatabase(db.path, verbose=False)
+            sample = max(1, per_call_rows // 10)
+            start = time.perf_counter()
+            for i in range(sample):
+                blog.add_comment(f"Комментарий {i}", i % posts + 1, i % users + 1, db=old_db)
+            open_per_call_rate = sample / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for i in range(per_call_rows):
+                blog.add_comment(f"Комментарий {i}", i % posts + 1, i % users + 1, db=db)
+            per_call_rate = per_call_rows / (time.perf_counter() - start)
+
+            # Каждая тысячная строка ссылается на несуществующий пост
+            comments = ((f"Комментарий {i}", posts + 1 if i % 1000 == 999 else i % posts + 1, i % users + 1)
+                        for i in range(rows))
+            start = time.perf_counter()
+            result = blog.add_comments_many(comments, chunk_size=chunk_size, db=db)
+            bulk_rate = rows / (time.perf_counter() - start)
+        finally:
+            db.close()
+
+    stats = {
+        'rows': rows,
+        'open_per_call_rows_per_sec': round(open_per_call_rate, 1),
+        'per_call_rows_per_sec': round(per_call_rate, 1),
+        'bulk_rows_per_sec': round(bulk_rate, 1),
+        'speedup_vs_open_per_call': round(bulk_rate / open_per_call_rate, 1),
+        'speedup': round(bulk_rate / per_call_rate, 1),
+        'inserted': result.inserted,
+        'rejected': len(result.rejected),
+    }
+
+    print("\n" + "=" * 60)
+    print("📦 ПАКЕТНАЯ ЗАГРУЗКА КОММЕНТАРИЕВ")
+    print("=" * 60)
+    print(f"add_comment (соединение на вызов): {stats['open_per_call_rows_per_sec']} строк/с")
+    print(f"add_comment (пул):                 {stats['per_call_rows_per_sec']} строк/с")
+    print(f"add_comments_many:                 {stats['bulk_rows_per_sec']} строк/с "
+          f"(x{stats['speedup_vs_open_per_call']} к исходному, x{stats['speedup']} к пулу, "
+          f"отклонено {stats['rejected']})")
+    return stats
+
+
+# Подсчет постов до появления счетчика users.post_count
+LEGACY_USERS_WITH_POST_COUNT_SQL = """
+    SELECT u.id, u.username, u.email, COUNT(p.id) as post_count
+    FROM users u
+    LEFT JOIN posts p ON u.id = p.user_id
+    GROUP BY u.id, u.username, u.email
+    ORDER BY post_count DESC
+"""
+
+# Лента обсуждений до миграций: счетчика comment_count еще нет
+LEGACY_THREAD_POSTS_SQL = """
+    SELECT
+        p.id,
+        p.title,
+        u.username as author,
+        p.created_at,
+        COUNT(c.id) as comment_count
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    LEFT JOIN comments c ON c.post_id = p.id
+    GROUP BY p.id
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+"""
+
+
+def _time_first_rows(db, sql, params, rows=100, repeats=3):
+    """Медианное время получения первых rows строк запроса, мс"""
+    timings = []
+    with db.connection() as conn:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchmany(rows)
+            timings.append(time.perf_counter() - start)
+    return round(percentile(timings, 50) * 1000, 3)
+
+
+def _fill_database(db, users, posts, comments, chunk_size=50_000):
+    blog.add_users_many(((f"user{i}", f"user{i}@example.com") for i in range(users)),
+                        chunk_size=chunk_size, db=db)
+    blog.add_categories_many([("Бенчмарк", None)], db=db)
+    blog.create_posts_many(((f"Пост {i}", "Текст поста", i % users + 1, 1) for i in range(posts)),
+                           chunk_size=chunk_size, db=db)
+    blog.add_comments_many(((f"Комментарий {i}", i % posts + 1, i % users + 1) for i in range(comments)),
+                           chunk_size=chunk_size, db=db)
+
+
+def benchmark_indexes(comments=10_000_000, posts=100_000, users=10_000):
+    """Время запросов модуля до и после миграций с индексами
+
+    Для каждого запроса меряется время получения первых 100 строк - именно
+    столько читает страница интерфейса. Затем проверяются планы запросов.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = blog.BlogDatabase(os.path.join(tmp, 'indexes.db'), verbose=False)
+        try:
+            blog.create_blog_database(db=db, apply_migrations=False)
+            _fill_database(db, users, posts, comments)
+
+            queries = blog.shipped_queries()
+            # До миграций счетчиков post_count и comment_count нет - меряются старые запросы;
+            # таблиц полнотекстового поиска нет совсем - поиск меряется только после
+            old_queries = dict(queries, users_with_post_count=(LEGACY_USERS_WITH_POST_COUNT_SQL, ()),
+                               thread_posts=(LEGACY_THREAD_POSTS_SQL, queries['thread_posts'][1]))
+            for name in ('search_posts', 'search_comments'):
+                del old_queries[name]
+            before = {name: _time_first_rows(db, sql, params) for name, (sql, params) in old_queries.items()}
+
+            start = time.perf_counter()
+            blog.migrate(db=db)
+            migration_seconds = time.perf_counter() - start
+
+            after = {name: _time_first_rows(db, sql, params) for name, (sql, params) in queries.items()}
+            problems = blog.check_query_plans(db=db)
+        finally:
+            db.close()
+
+    print("\n" + "=" * 60)
+    print(f"🗂️  ИНДЕКСЫ: {comments} комментариев, {posts} постов, {users} пользователей")
+    print("=" * 60)
+    for name in after:
+        print(f"{name:25s} до: {before.get(name, '—'):>10} мс   после: {after[name]:>10} мс")
+    print(f"Применение миграций: {migration_seconds:.1f} с")
+
+    if problems:
+        raise AssertionError(f"Запросы со сканированием таблиц: {problems}")
+    return {'before_ms': before, 'after_ms': after, 'migration_seconds': round(migration_seconds, 2)}
+
+
+def _make_vocabulary(rng, size):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def benchmark_search(posts=1_000_000, queries=200, vocabulary=20_000, words_per_post=40, seed=42):
+    """Задержка search_posts на posts постах со случайным словарем
+
+    Слова выбираются с перекосом (частые слова встречаются гораздо чаще),
+    запросы - одно или два слова из словаря.
+    """
+    rng = random.Random(seed)
+    words = _make_vocabulary(rng, vocabulary)
+    # Веса 1/rank дают распределение, похожее на естественный язык
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+
+    def text(count):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=count))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = blog.BlogDatabase(os.path.join(tmp, 'search.db'), verbose=False)
+        try:
+            blog.create_blog_database(db=db)
+            blog.add_users_many([("author", "author@example.com")], db=db)
+            blog.add_categories_many([("Бенчмарк", None)], db=db)
+            start = time.perf_counter()
+            blog.create_posts_many(((text(6), text(words_per_post), 1, 1) for _ in range(posts)),
+                                   chunk_size=10_000, db=db)
+            load_seconds = time.perf_counter() - start
+            blog.optimize_search_index(db=db)
+
+            latencies = []
+            for _ in range(queries):
+                query = " ".join(rng.sample(words[:2000], rng.randint(1, 2)))
+                t0 = time.perf_counter()
+                blog.search_posts(query, limit=20, db=db)
+                latencies.append(time.perf_counter() - t0)
+        finally:
+            db.close()
+
+    stats = {
+        'posts': posts,
+        'load_seconds': round(load_seconds, 1),
+        'query_p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'query_p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'query_p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"🔎 ПОЛНОТЕКСТОВЫЙ ПОИСК: {posts} постов")
+    print("=" * 60)
+    print(f"Загрузка с индексацией: {stats['load_seconds']} с")
+    print(f"search_posts p50: {stats['query_p50_ms']} мс  p95: {stats['query_p95_ms']} мс  "
+          f"p99: {stats['query_p99_ms']} мс")
+    return stats
+
+
+def benchmark_async(concurrency=1000, requests_per_task=20, write_ratio=0.1, readers=4, seed=42):
+    """Нагрузочный тест AsyncBlogDatabase: concurrency корутин одновременно
+
+    Каждая корутина выполняет requests_per_task запросов: с вероятностью
+    write_ratio - add_comment, иначе первую страницу ленты или комментарии поста.
+    """
+    async def run(facade, posts, users):
+        rng = random.Random(seed)
+        latencies = []
+
+        async def client(client_id):
+            for i in range(requests_per_task):
+                roll = rng.random()
+                post_id = rng.randint(1, posts)
+                t0 = time.perf_counter()
+                if roll < write_ratio:
+                    await facade.add_comment(f"Комментарий {client_id}-{i}", post_id, rng.randint(1, users))
+                elif roll < (1 + write_ratio) / 2:
+                    await facade.get_posts_page(20)
+                else:
+                    await facade.get_post_comments(post_id, limit=20)
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+        return latencies, time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = blog.BlogDatabase(os.path.join(tmp, 'async.db'), pool_size=readers + 1, verbose=False)
+        blog.create_blog_database(db=db)
+        _fill_database(db, users=1000, posts=1000, comments=50_000)
+        facade = blog.AsyncBlogDatabase(db, readers=readers)
+        try:
+            latencies, seconds = asyncio.run(run(facade, posts=1000, users=1000))
+        finally:
+            facade.close()
+
+    stats = {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'p999_ms': round(percentile(latencies, 99.9) * 1000, 3),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"⚡ ASYNC-ФАСАД: {concurrency} корутин, {stats['requests']} запросов")
+    print("=" * 60)
+    print(f"запросов/с: {stats['requests_per_sec']}  p50: {stats['p50_ms']} мс  "
+          f"p99: {stats['p99_ms']} мс  p99.9: {stats['p999_ms']} мс")
+    return stats
+
+
+def benchmark_group_commit(threads=16, comments_per_thread=300, durability='full',
+                           max_rows=500, max_delay_ms=0):
+    """add_comment из многих потоков: фиксация на каждый вызов против групповой
+
+    Обе базы открываются с одинаковым synchronous, чтобы сравнивались
+    одинаковые гарантии сохранности.
+    """
+    level = blog.GroupCommitQueue.DURABILITY_LEVELS[durability]
+
+    def hammer(db):
+        def worker(worker_id):
+            for i in range(comments_per_thread):
+                blog.add_comment(f"Комментарий {worker_id}-{i}", i % 100 + 1, worker_id % 100 + 1, db=db)
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return threads * comments_per_thread / (time.perf_counter() - start)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('per_call', 'group_commit'):
+            db = blog.BlogDatabase(os.path.join(tmp, f'{mode}.db'), pool_size=threads + 1,
+                                   verbose=False, synchronous=level)
+            try:
+                blog.create_blog_database(db=db)
+                _fill_database(db, users=100, posts=100, comments=0)
+                if mode == 'group_commit':
+                    db.write_queue = blog.GroupCommitQueue(db, max_rows=max_rows, max_delay_ms=max_delay_ms,
+                                                           durability=durability)
+                results[mode] = round(hammer(db), 1)
+                if db.write_queue is not None:
+                    results['batches'] = db.write_queue.batches
+            finally:
+                db.close()
+
+    print("\n" + "=" * 60)
+    print(f"🧺 ГРУППОВАЯ ФИКСАЦИЯ: {threads} потоков, synchronous={level}")
+    print("=" * 60)
+    print(f"фиксация на вызов: {results['per_call']} комментариев/с")
+    print(f"групповая:         {results['group_commit']} комментариев/с ({results['batches']} транзакций)")
+    return results
+
+
+def benchmark_export(comments=20_000_000, posts=200_000, users=20_000, chunk_size=10_000):
+    """Скорость онлайн-снимка и потоковой выгрузки, МБ/с
+
+    Во время снимка отдельный поток пишет комментарии - видно, что писатели
+    не ждут окончания копирования. При размерах по умолчанию база занимает
+    несколько гигабайт.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = blog.BlogDatabase(os.path.join(tmp, 'blog.db'), verbose=False)
+        try:
+            blog.create_blog_database(db=db)
+            _fill_database(db, users=users, posts=posts, comments=comments)
+            results['database_mb'] = round(_database_size(db.path) / 2**20, 1)
+
+            stop = threading.Event()
+            writes = []
+
+            def writer():
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    blog.add_comment("Комментарий во время снимка", 1, 1, db=db)
+                    writes.append(time.perf_counter() - start)
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            try:
+                snapshot = blog.snapshot_database(os.path.join(tmp, 'snapshot.db'), db=db)
+            finally:
+                stop.set()
+                thread.join()
+            results['snapshot'] = {
+                'mb_per_sec': round(snapshot.bytes / 2**20 / snapshot.seconds, 1),
+                'seconds': round(snapshot.seconds, 2),
+                'restarts': snapshot.restarts,
+                'writes_during': len(writes),
+                'write_p99_ms': round(percentile(writes, 99) * 1000, 3) if writes else None,
+            }
+
+            for name in ('comments.ndjson.gz', 'comments.csv.gz', 'comments.ndjson'):
+                export = blog.export_table('comments', os.path.join(tmp, name), chunk_size=chunk_size, db=db)
+                results[name] = {
+                    'mb_per_sec': round(export.raw_bytes / 2**20 / export.seconds, 1),
+                    'rows_per_sec': round(export.rows / export.seconds),
+                    'raw_mb': round(export.raw_bytes / 2**20, 1),
+                    'file_mb': round(export.file_bytes / 2**20, 1),
+                }
+        finally:
+            db.close()
+
+    print("\n" + "=" * 60)
+    print(f"📦 СНИМОК И ВЫГРУЗКА: база {results['database_mb']} МБ")
+    print("=" * 60)
+    snapshot = results['snapshot']
+    print(f"снимок: {snapshot['mb_per_sec']} МБ/с, записей во время снимка: {snapshot['writes_during']} "
+          f"(p99 {snapshot['write_p99_ms']} мс), перезапусков: {snapshot['restarts']}")
+    for name in ('comments.ndjson.gz', 'comments.csv.gz', 'comments.ndjson'):
+        export = results[name]
+        print(f"{name}: {export['mb_per_sec']} МБ/с, {export['rows_per_sec']} строк/с, "
+              f"{export['raw_mb']} МБ -> {export['file_mb']} МБ")
+    return results
+
+
+# Синтетическая нагрузка и общий прогон
+
+SCALES = {
+    'tiny': {'users': 100, 'categories': 5, 'posts': 1_000, 'comments': 10_000},
+    'small': {'users': 1_000, 'categories': 20, 'posts': 10_000, 'comments': 100_000},
+    'medium': {'users': 10_000, 'categories': 50, 'posts': 100_000, 'comments': 1_000_000},
+    'large': {'users': 100_000, 'categories': 100, 'posts': 1_000_000, 'comments': 10_000_000},
+}
+
+
+class ZipfSampler:
+    """Выбор номера 1..n с вероятностью ~1/rank^s: немногие номера встречаются часто
+
+    Номера перемешаны, поэтому "горячие" пользователи и посты - не обязательно
+    первые созданные.
+    """
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.ids = list(range(1, n + 1))
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+    def sample(self, k=1):
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+    def one(self):
+        return self.sample(1)[0]
+
+
+def generate_workload(db, users=1_000, categories=20, posts=10_000, comments=100_000, seed=42,
+                      author_skew=1.1, post_skew=1.2, chunk_size=50_000):
+    """Заполнение пустой базы воспроизводимыми данными с перекосом
+
+    Авторы постов и комментариев выбираются по Zipf (author_skew), посты для
+    комментариев - тоже по Zipf (post_skew): несколько постов собирают большую
+    часть обсуждения. Одинаковый seed дает одинаковую базу.
+    """
+    rng = random.Random(seed)
+    words = _make_vocabulary(rng, 5_000)
+    word_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def text(count):
+        return " ".join(rng.choices(words, cum_weights=word_weights, k=count))
+
+    authors = ZipfSampler(users, author_skew, rng)
+    hot_posts = ZipfSampler(posts, post_skew, rng)
+
+    start = time.perf_counter()
+    blog.add_users_many(((f"user{i}", f"user{i}@example.com") for i in range(users)),
+                        chunk_size=chunk_size, db=db)
+    blog.add_categories_many(((f"Категория {i}", text(5)) for i in range(categories)), db=db)
+    blog.create_posts_many(((text(rng.randint(3, 8)), text(rng.randint(20, 200)), authors.one(),
+                             rng.randint(1, categories)) for _ in range(posts)),
+                           chunk_size=chunk_size, db=db)
+    blog.add_comments_many(((text(rng.randint(3, 30)), hot_posts.one(), authors.one())
+                            for _ in range(comments)),
+                           chunk_size=chunk_size, db=db)
+    return {
+        'users': users, 'categories': categories, 'posts': posts, 'comments': comments,
+        'seed': seed, 'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+def _database_size(path):
+    """Размер файла базы вместе с WAL, байт"""
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal', '-shm')
+               if os.path.exists(path + suffix))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _workload_operations(rng, words, counts, thread_id):
+    """Операции смешанной нагрузки: имя -> (вес, функция без аргументов)"""
+    posts = ZipfSampler(counts['posts'], 1.2, rng)
+    users = ZipfSampler(counts['users'], 1.1, rng)
+    serial = itertools.count()
+
+    def phrase(k):
+        return " ".join(rng.sample(words, k))
+
+    reads = {
+        'get_posts_page': (30, lambda db: blog.get_posts_page(20, db=db)),
+        'get_post_threads_page': (15, lambda db: blog.get_post_threads_page(10, comments_per_post=5, db=db)),
+        'get_post_comments': (30, lambda db: blog.get_post_comments(posts.one(), limit=50, db=db)),
+        'get_users_with_post_count': (5, lambda db: blog.get_users_with_post_count(db=db)),
+        'search_posts': (10, lambda db: blog.search_posts(phrase(1), limit=10, db=db)),
+        'search_comments': (5, lambda db: blog.search_comments(phrase(1), limit=10, db=db)),
+        # Полные выборки без пагинации - редкие и тяжелые
+        'get_all_posts_with_authors': (0.05, lambda db: blog.get_all_posts_with_authors(db=db)),
+        'get_posts_with_comments': (0.05, lambda db: blog.get_posts_with_comments(db=db)),
+    }
+    writes = {
+        'add_comment': (70, lambda db: blog.add_comment(phrase(5), posts.one(), users.one(), db=db)),
+        'create_post': (20, lambda db: blog.create_post(phrase(4), phrase(40), users.one(),
+                                                        rng.randint(1, counts['categories']), db=db)),
+        'add_user': (8, lambda db: blog.add_user(f"bench{thread_id}_{next(serial)}",
+                                                 f"bench{thread_id}_{next(serial)}@example.com", db=db)),
+        'add_category': (2, lambda db: blog.add_category(f"Бенчмарк {thread_id}-{next(serial)}", db=db)),
+    }
+    return reads, writes
+
+
+def run_benchmark(scale='small', read_ratio=0.95, operations=20_000, threads=4, seed=42,
+                  path=None, output=None):
+    """Смешанная нагрузка на все публичные функции; результат - словарь для JSON
+
+    Если path не задан или файла еще нет, база создается и заполняется
+    generate_workload по размеру scale. Существующая база используется как есть:
+    данные не генерируются (generation в отчете - None), а scale задает только
+    диапазоны id в нагрузке. Отчет содержит пропускную способность,
+    p50/p95/p99 по каждой операции и размер файла базы - так прогоны на разных
+    коммитах можно сравнивать между собой.
+    """
+    counts = SCALES[scale]
+    reuse = path is not None and os.path.exists(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = path or os.path.join(tmp, 'workload.db')
+        db = blog.BlogDatabase(path, pool_size=threads + 1, verbose=False)
+        try:
+            blog.create_blog_database(db=db)
+            generation = None if reuse else generate_workload(db, seed=seed, **counts)
+            size_before = _database_size(path)
+            words = _make_vocabulary(random.Random(seed), 5_000)[:500]
+
+            latencies = {}
+            lock = threading.Lock()
+
+            def worker(thread_id):
+                rng = random.Random(seed * 1000 + thread_id)
+                reads, writes = _workload_operations(rng, words, counts, thread_id)
+                mixes = [(list(group), list(itertools.accumulate(w for w, _ in group.values())))
+                         for group in (reads, writes)]
+                local = {}
+                for _ in range(operations // threads):
+                    names, weights = mixes[0] if rng.random() < read_ratio else mixes[1]
+                    name = rng.choices(names, cum_weights=weights)[0]
+                    func = reads[name][1] if name in reads else writes[name][1]
+                    t0 = time.perf_counter()
+                    func(db)
+                    local.setdefault(name, []).append(time.perf_counter() - t0)
+                with lock:
+                    for name, values in local.items():
+                        latencies.setdefault(name, []).extend(values)
+
+            pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+            start = time.perf_counter()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            seconds = time.perf_counter() - start
+            size_after = _database_size(path)
+        finally:
+            db.close()
+
+    total = sum(len(values) for values in latencies.values())
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'params': {'scale': scale, 'read_ratio': read_ratio, 'operations': operations,
+                   'threads': threads, 'seed': seed},
+        'generation': generation,
+        'throughput_ops_per_sec': round(total / seconds, 1),
+        'db_size_bytes': {'after_generation': size_before, 'after_run': size_after},
+        'operations': {
+            name: {
+                'count': len(values),
+                'ops_per_sec': round(len(values) / seconds, 1),
+                'p50_ms': round(percentile(values, 50) * 1000, 3),
+                'p95_ms': round(percentile(values, 95) * 1000, 3),
+                'p99_ms': round(percentile(values, 99) * 1000, 3),
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def main():
+    """Запуск общего прогона (по умолчанию) или отдельных бенчмарков"""
+    parser = argparse.ArgumentParser(description="Бенчмарки базы данных блога")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--read-ratio', type=float, default=0.95)
+    parser.add_argument('--operations', type=int, default=20_000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--path', help="файл базы: существующий используется без генерации данных, "
+                                       "новый создается и остается после прогона")
+    parser.add_argument('--output', help="файл для JSON-отчета (иначе вывод в консоль)")
+    parser.add_argument('--micro', action='store_true', help="отдельные бенчмарки вместо общего прогона")
+    args = parser.parse_args()
+
+    if args.micro:
+        benchmark_connection_pool()
+        benchmark_bulk_ingest()
+        benchmark_indexes()
+        benchmark_search()
+        benchmark_async()
+        benchmark_group_commit()
+        benchmark_export()
+        return
+
+    report = run_benchmark(args.scale, args.read_ratio, args.operations, args.threads, args.seed,
+                           path=args.path, output=args.output)
+    if not args.output:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,311 +1,2252 @@
+import asyncio
+import base64
+import binascii
+import bisect
+import bz2
+import csv
+import functools
+import gzip
+import heapq
+import io
+import json
+import lzma
+import os
+import queue
 import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 
-def create_blog_database():
+DEFAULT_DB_PATH = 'blog.db'
+
+class BlogDatabase:
+    """Пул долгоживущих соединений с базой данных блога
+
+    Соединения открываются лениво (не больше pool_size), PRAGMA выставляются
+    один раз при открытии соединения. Поток, который уже держит соединение,
+    при повторном входе в connection() получает это же соединение.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=5, timeout=30.0,
+                 mmap_size=256 * 1024 * 1024, cache_size=-64 * 1024, verbose=True,
+                 query_cache=None, synchronous='NORMAL', profiler=None):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size  # отрицательное значение - размер в KiB
+        self.synchronous = synchronous
+        self.verbose = verbose
+        self.query_cache = query_cache  # QueryCache или None - без кэширования
+        self.write_queue = None  # GroupCommitQueue для add_comment/create_post
+        self.profiler = profiler  # QueryProfiler или None - без замеров
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def echo(self, message):
+        """Вывод сообщения, если включен подробный режим"""
+        if self.verbose:
+            print(message)
+
+    def invalidate(self, *tags):
+        """Сброс закэшированных результатов чтения по тегам; без тегов - всех"""
+        if self.query_cache is None:
+            return
+        if tags:
+            self.query_cache.invalidate(*tags)
+        else:
+            self.query_cache.clear()
+
+    def _open_connection(self):
+        """Открытие нового соединения и однократная настройка PRAGMA"""
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        return conn
+
+    def _acquire(self):
+        """Взять свободное соединение из пула или открыть новое"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Пул соединений закрыт")
+            if len(self._connections) < self.pool_size:
+                conn = self._open_connection()
+                self._connections.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Нет свободных соединений в пуле за {self.timeout} с"
+            ) from None
+
+    def _release(self, conn):
+        """Вернуть соединение в пул, откатив незавершенную транзакцию"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._closed:
+                conn.close()
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Соединение из пула на время блока with"""
+        conn = getattr(self._local, 'conn', None)
+        owner = conn is None
+        if owner:
+            conn = self._acquire()
+            self._local.conn = conn
+        try:
+            # Без профилировщика соединение отдается как есть - замеры ничего не стоят
+            if self.profiler is None:
+                yield conn
+            else:
+                profiled = _ProfiledConnection(conn, self.profiler)
+                try:
+                    yield profiled
+                finally:
+                    profiled.finish()
+        finally:
+            if owner:
+                self._local.conn = None
+                self._release(conn)
+
+    def close(self):
+        """Закрытие всех свободных соединений; занятые закроются при возврате"""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class QueryProfiler:
+    """Замеры всех SQL-запросов модуля: время, число строк, вызвавшая функция
+
+    Подключается к базе: db.profiler = QueryProfiler(...). Запросы дольше
+    slow_query_ms попадают в журнал медленных запросов вместе с EXPLAIN QUERY
+    PLAN - в память (slow_queries) и, если задан slow_log, в файл строками JSON.
+    По каждому запросу копится гистограмма времени, см. dump_stats().
+    """
+
+    # Верхние границы корзин гистограммы, мс
+    BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+    def __init__(self, slow_query_ms=100.0, slow_log=None, max_slow_queries=1000):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log = slow_log
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql, params, seconds, rows, caller):
+        """Учет одного выполненного запроса"""
+        ms = seconds * 1000
+        key = " ".join(sql.split())
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'callers': set(), 'histogram': [0] * len(self.BUCKETS_MS),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['rows'] += rows
+            stats['callers'].add(caller)
+            stats['histogram'][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+
+        if ms >= self.slow_query_ms:
+            self._log_slow(conn, key, sql, params, ms, rows, caller)
+
+    def _log_slow(self, conn, key, sql, params, ms, rows, caller):
+        # executemany: в журнал - число наборов и первый набор, по нему же строится план
+        batch = None
+        if isinstance(params, _ManyParams):
+            batch, params = params.count, params.first
+        plan = None
+        if isinstance(params, (tuple, list, dict)):
+            try:
+                # Обычный курсор, чтобы EXPLAIN сам не попал в замеры
+                plan = [row[-1] for row in sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params)]
+            except sqlite3.Error:
+                pass
+        entry = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'caller': caller,
+            'ms': round(ms, 3),
+            'rows': rows,
+            'sql': key,
+            'params': [str(value)[:200] for value in params] if isinstance(params, (tuple, list)) else None,
+            'batch_rows': batch,
+            'plan': plan,
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+            if self.slow_log:
+                with open(self.slow_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def stats(self):
+        """Сводка по запросам, самые затратные по суммарному времени первыми"""
+        with self._lock:
+            items = [(key, dict(value, callers=sorted(value['callers']), histogram=list(value['histogram'])))
+                     for key, value in self._stats.items()]
+        report = []
+        for sql, stats in sorted(items, key=lambda item: item[1]['total_ms'], reverse=True):
+            report.append({
+                'sql': sql,
+                'callers': stats['callers'],
+                'count': stats['count'],
+                'rows': stats['rows'],
+                'total_ms': round(stats['total_ms'], 3),
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                'max_ms': round(stats['max_ms'], 3),
+                'histogram_ms': {
+                    ('inf' if bound == float('inf') else f"<={bound}"): count
+                    for bound, count in zip(self.BUCKETS_MS, stats['histogram']) if count
+                },
+            })
+        return report
+
+    def dump_stats(self, path=None):
+        """Сводка в файл JSON (если задан path) и как результат"""
+        report = self.stats()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def reset(self):
+        """Сброс накопленной статистики"""
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+
+def _query_caller():
+    """Публичная функция модуля, из которой пришел запрос
+
+    Закрытые функции (с '_') не указываются. Если публичной функции в стеке
+    нет - как в потоке GroupCommitQueue - вызвавшим считается публичный класс,
+    метод которого выполнил запрос.
+    """
+    frame = sys._getframe(2)
+    owner = None
+    while frame is not None:
+        if frame.f_globals is globals():
+            name = frame.f_code.co_name
+            qualname = getattr(frame.f_code, 'co_qualname', name)
+            if not name.startswith(('_', '<')) and '<locals>' not in qualname:
+                return name
+            outer = qualname.split('.')[0]
+            if owner is None and outer != qualname and not outer.startswith('_'):
+                owner = outer
+        frame = frame.f_back
+    return owner or 'unknown'
+
+class _ManyParams:
+    """Наборы параметров executemany: считает их на лету и запоминает первый"""
+
+    def __init__(self):
+        self.count = 0
+        self.first = None
+
+    def wrap(self, seq_of_params):
+        for params in seq_of_params:
+            if not self.count:
+                self.first = params
+            self.count += 1
+            yield params
+
+class _ProfiledCursor:
+    """Курсор, который меряет запрос от execute до последней прочитанной строки"""
+
+    def __init__(self, cursor, profiler, unfinished):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._pending = None  # [sql, params, вызвавший, секунды, строки]
+        # Общее для соединения множество курсоров с незаписанным замером
+        self._unfinished = unfinished
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _run(self, method, sql, params, caller, logged=None):
+        self.finish()
+        start = time.perf_counter()
+        method(sql, params)
+        self._pending = [sql, params if logged is None else logged, caller, time.perf_counter() - start, 0]
+        if self._cursor.description is None:
+            # Не SELECT - читать нечего, число строк - затронутые
+            self._pending[4] = max(self._cursor.rowcount, 0)
+            self.finish()
+        else:
+            self._unfinished.add(self)
+        return self
+
+    def execute(self, sql, params=(), caller=None):
+        return self._run(self._cursor.execute, sql, params, caller or _query_caller())
+
+    def executemany(self, sql, seq_of_params, caller=None):
+        many = _ManyParams()
+        return self._run(self._cursor.executemany, sql, many.wrap(seq_of_params),
+                         caller or _query_caller(), many)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self.finish()
+        elif self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        if len(rows) < (size or self._cursor.arraysize):
+            self.finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        self.finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def finish(self):
+        """Записать замер текущего запроса (если он еще не записан)"""
+        if self._pending is not None:
+            sql, params, caller, seconds, rows = self._pending
+            self._pending = None
+            self._unfinished.discard(self)
+            self._profiler.record(self._cursor.connection, sql, params, seconds, rows, caller)
+
+    def close(self):
+        self.finish()
+        self._cursor.close()
+
+class _ProfiledConnection:
+    """Обертка соединения из пула, выдающая профилируемые курсоры"""
+
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self._profiler = profiler
+        # Только курсоры с недочитанным запросом: записанные сразу отпускаются,
+        # и долгий блок with (поток групповой фиксации) не копит их
+        self._cursors = set()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return _ProfiledCursor(self._conn.cursor(), self._profiler, self._cursors)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params, caller=_query_caller())
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params, caller=_query_caller())
+
+    def finish(self):
+        """Записать замеры недочитанных запросов при возврате соединения"""
+        for cursor in list(self._cursors):
+            cursor.finish()
+
+class QueryCache:
+    """Кэш результатов чтения: LRU + TTL + ограничение по памяти
+
+    Каждая запись помечена тегами ('posts', 'users', 'comments:<post_id>', ...),
+    запись в базу сбрасывает записи с нужными тегами. Изменения в обход
+    функций модуля кэш не видит - их устаревание ограничено TTL.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # ключ -> (истекает, размер, теги, значение)
+        self._tag_keys = defaultdict(set)
+        self._tag_versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """(True, значение) при попадании, (False, None) при промахе"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[3]
+
+    def versions(self, tags):
+        """Версии тегов до чтения из базы - см. put()"""
+        with self._lock:
+            return tuple(self._tag_versions[tag] for tag in tags)
+
+    def put(self, key, value, tags, versions=None):
+        """Сохранение значения; пропускается, если теги сбросили во время чтения"""
+        size = _estimate_size(value)
+        with self._lock:
+            if versions is not None and versions != tuple(self._tag_versions[tag] for tag in tags):
+                return
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, tags, value)
+            self.bytes += size
+            for tag in tags:
+                self._tag_keys[tag].add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Удаление всех записей с любым из тегов"""
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] += 1
+                for key in self._tag_keys.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        """Полная очистка кэша (счетчики сохраняются)"""
+        with self._lock:
+            for tag in self._tag_keys:
+                self._tag_versions[tag] += 1
+            self._entries.clear()
+            self._tag_keys.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Счетчики для мониторинга"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, size, tags, _ = self._entries.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+def _estimate_size(value):
+    """Приблизительный размер значения в байтах (кортежи, списки, строки, числа)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+def _cached(db, key, tags, loader):
+    """Результат loader() через кэш базы; loader должен вернуть неизменяемое значение"""
+    cache = db.query_cache
+    if cache is None:
+        return loader()
+    found, value = cache.get(key)
+    if not found:
+        versions = cache.versions(tags)
+        value = loader()
+        cache.put(key, value, tags, versions)
+    return value
+
+def _fetch_rows(db, sql, params=(), row_type=None):
+    """Все строки запроса кортежем - в таком виде их можно класть в кэш"""
+    with db.connection() as conn:
+        cursor = conn.execute(sql, params)
+        if row_type is None:
+            return tuple(cursor)
+        return tuple(row_type._make(row) for row in cursor)
+
+_default_db = None
+_default_db_lock = threading.Lock()
+
+def get_database():
+    """База данных, через которую работают функции модуля по умолчанию"""
+    global _default_db
+    if _default_db is None:
+        with _default_db_lock:
+            if _default_db is None:
+                _default_db = BlogDatabase()
+    return _default_db
+
+def set_database(db):
+    """Замена базы данных по умолчанию; возвращает предыдущую"""
+    global _default_db
+    with _default_db_lock:
+        previous, _default_db = _default_db, db
+    return previous
+
+def _resolve_db(db):
+    return db if db is not None else get_database()
+
+def _single_file_db(db, what):
+    """База для операций над одним файлом SQLite; для шардов - TypeError"""
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        raise TypeError(f"{what} не поддерживает ShardedBlogDatabase - вызывайте для каждого шарда из db.shards")
+    return db
+
+def create_blog_database(db=None, apply_migrations=True):
     """Создание базы данных и таблиц для блога"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.create(apply_migrations)
+    with db.connection() as conn:
+        cursor = conn.cursor()
 
-    try:
-        # Таблица пользователей
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                email TEXT NOT NULL UNIQUE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Таблица категорий
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT
-            )
-        """)
-        
-        # Таблица постов (с внешними ключами)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                category_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-                FOREIGN KEY (category_id) REFERENCES categories (id)
-            )
-        """)
-        
-        # Таблица комментариев
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT NOT NULL,
-                post_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users (id)
+        try:
+            # Таблица пользователей
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL UNIQUE,
+                    email TEXT NOT NULL UNIQUE,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Таблица категорий
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS categories (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    description TEXT
+                )
+            """)
+
+            # Таблица постов (с внешними ключами)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                    FOREIGN KEY (category_id) REFERENCES categories (id)
+                )
+            """)
+
+            # Таблица комментариев
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS comments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    post_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            """)
+
+            # Поддержка внешних ключей включается в BlogDatabase при открытии соединения
+
+            conn.commit()
+            db.echo("✅ База данных блога успешно создана!")
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            db.echo(f"❌ Ошибка при создании БД: {e}")
+            return
+
+    if apply_migrations:
+        try:
+            migrate(db=db)
+        except sqlite3.Error:
+            pass  # сообщение уже выведено в migrate
+
+# Версионированные миграции схемы
+
+# Пересчет счетчиков: обновляются только разошедшиеся строки
+RECONCILE_POST_COUNT_SQL = """
+    UPDATE users
+    SET post_count = (SELECT COUNT(*) FROM posts WHERE posts.user_id = users.id)
+    WHERE post_count != (SELECT COUNT(*) FROM posts WHERE posts.user_id = users.id)
+"""
+
+RECONCILE_COMMENT_COUNT_SQL = """
+    UPDATE posts
+    SET comment_count = (SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)
+    WHERE comment_count != (SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)
+"""
+
+MIGRATIONS = [
+    (1, "Индексы для ленты постов, комментариев к постам и подсчета постов", [
+        "CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments (post_id, created_at)",
+    ]),
+    (2, "Счетчики users.post_count и posts.comment_count на триггерах", [
+        "ALTER TABLE users ADD COLUMN post_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE TRIGGER trg_posts_count_insert AFTER INSERT ON posts
+        BEGIN
+            UPDATE users SET post_count = post_count + 1 WHERE id = NEW.user_id;
+        END
+        """,
+        # Срабатывает и при ON DELETE CASCADE от удаления пользователя
+        """
+        CREATE TRIGGER trg_posts_count_delete AFTER DELETE ON posts
+        BEGIN
+            UPDATE users SET post_count = post_count - 1 WHERE id = OLD.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_count_update AFTER UPDATE OF user_id ON posts
+        WHEN OLD.user_id IS NOT NEW.user_id
+        BEGIN
+            UPDATE users SET post_count = post_count - 1 WHERE id = OLD.user_id;
+            UPDATE users SET post_count = post_count + 1 WHERE id = NEW.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_comments_count_insert AFTER INSERT ON comments
+        BEGIN
+            UPDATE posts SET comment_count = comment_count + 1 WHERE id = NEW.post_id;
+        END
+        """,
+        # Срабатывает и при ON DELETE CASCADE от удаления поста
+        """
+        CREATE TRIGGER trg_comments_count_delete AFTER DELETE ON comments
+        BEGIN
+            UPDATE posts SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_comments_count_update AFTER UPDATE OF post_id ON comments
+        WHEN OLD.post_id IS NOT NEW.post_id
+        BEGIN
+            UPDATE posts SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+            UPDATE posts SET comment_count = comment_count + 1 WHERE id = NEW.post_id;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_users_post_count ON users (post_count, username, email)",
+        RECONCILE_POST_COUNT_SQL,
+        RECONCILE_COMMENT_COUNT_SQL,
+    ]),
+    (3, "Полнотекстовый поиск FTS5 по постам и комментариям", [
+        """
+        CREATE VIRTUAL TABLE posts_fts USING fts5(
+            title, content,
+            content='posts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE comments_fts USING fts5(
+            text,
+            content='comments', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER trg_posts_fts_insert AFTER INSERT ON posts
+        BEGIN
+            INSERT INTO posts_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_fts_delete AFTER DELETE ON posts
+        BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, content)
+            VALUES ('delete', OLD.id, OLD.title, OLD.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_fts_update AFTER UPDATE OF title, content ON posts
+        BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, content)
+            VALUES ('delete', OLD.id, OLD.title, OLD.content);
+            INSERT INTO posts_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_comments_fts_insert AFTER INSERT ON comments
+        BEGIN
+            INSERT INTO comments_fts (rowid, text) VALUES (NEW.id, NEW.text);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_comments_fts_delete AFTER DELETE ON comments
+        BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_comments_fts_update AFTER UPDATE OF text ON comments
+        BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+            INSERT INTO comments_fts (rowid, text) VALUES (NEW.id, NEW.text);
+        END
+        """,
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+        "INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')",
+    ]),
+]
+
+def get_schema_version(db=None):
+    """Текущая версия схемы (0, если миграции еще не применялись)"""
+    db = _single_file_db(db, 'get_schema_version()')
+    with db.connection() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        
-        # Включаем поддержку внешних ключей
-        cursor.execute("PRAGMA foreign_keys = ON")
-        
-        conn.commit()
-        print("✅ База данных блога успешно создана!")
-        
-    except sqlite3.Error as e:
-        conn.rollback()
-        print(f"❌ Ошибка при создании БД: {e}")
-    finally:
-        conn.close()
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(target=None, db=None):
+    """Применение недостающих миграций по порядку, каждой в своей транзакции
+
+    Шаг миграции - SQL-строка или функция, принимающая курсор.
+    Возвращает версию схемы после применения.
+    """
+    db = _single_file_db(db, 'migrate()')
+    version = get_schema_version(db=db)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for number, description, steps in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            try:
+                cursor.execute("BEGIN")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (number, description)
+                )
+                conn.commit()
+                db.invalidate()
+            except sqlite3.Error as e:
+                conn.rollback()
+                db.echo(f"❌ Ошибка миграции {number} ({description}): {e}")
+                raise
+            version = number
+            db.echo(f"✅ Миграция {number} применена: {description}")
+    return version
+
+def reconcile_counters(db=None):
+    """Пересборка счетчиков post_count и comment_count по реальным данным
+
+    Возвращает (исправлено пользователей, исправлено постов).
+    """
+    db = _single_file_db(db, 'reconcile_counters()')
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(RECONCILE_POST_COUNT_SQL)
+            users_fixed = cursor.rowcount
+            cursor.execute(RECONCILE_COMMENT_COUNT_SQL)
+            posts_fixed = cursor.rowcount
+            conn.commit()
+            db.invalidate()
+            db.echo(f"✅ Счетчики пересчитаны: пользователей {users_fixed}, постов {posts_fixed}")
+            return users_fixed, posts_fixed
+        except sqlite3.Error as e:
+            conn.rollback()
+            db.echo(f"❌ Ошибка при пересчете счетчиков: {e}")
+            return None
 
-def add_user(username, email):
+def add_user(username, email, db=None):
     """Добавление нового пользователя"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-            INSERT INTO users (username, email) 
-            VALUES (?, ?)
-        """, (username, email))
-        
-        conn.commit()
-        print(f"✅ Пользователь '{username}' успешно добавлен!")
-        return cursor.lastrowid
-    except sqlite3.IntegrityError:
-        print(f"❌ Ошибка: пользователь с таким именем или email уже существует")
-        return None
-    except sqlite3.Error as e:
-        print(f"❌ Ошибка при добавлении пользователя: {e}")
-        return None
-    finally:
-        conn.close()
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.add_user(username, email)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                INSERT INTO users (username, email) 
+                VALUES (?, ?)
+            """, (username, email))
 
-def add_category(name, description=None):
+            conn.commit()
+            db.invalidate('users')
+            db.echo(f"✅ Пользователь '{username}' успешно добавлен!")
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            db.echo(f"❌ Ошибка: пользователь с таким именем или email уже существует")
+            return None
+        except sqlite3.Error as e:
+            db.echo(f"❌ Ошибка при добавлении пользователя: {e}")
+            return None
+
+def add_category(name, description=None, db=None):
     """Добавление новой категории"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-            INSERT INTO categories (name, description) 
-            VALUES (?, ?)
-        """, (name, description))
-        
-        conn.commit()
-        print(f"✅ Категория '{name}' успешно добавлена!")
-        return cursor.lastrowid
-    except sqlite3.IntegrityError:
-        print(f"❌ Ошибка: категория с таким названием уже существует")
-        return None
-    except sqlite3.Error as e:
-        print(f"❌ Ошибка при добавлении категории: {e}")
-        return None
-    finally:
-        conn.close()
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.add_category(name, description)
+    with db.connection() as conn:
+        cursor = conn.cursor()
 
-def create_post(title, content, user_id, category_id):
-    """Создание нового поста"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
-    try:
-        # Проверяем существование пользователя
-        cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
-        if not cursor.fetchone():
-            print(f"❌ Ошибка: пользователь с ID {user_id} не существует")
+        try:
+            cursor.execute("""
+                INSERT INTO categories (name, description) 
+                VALUES (?, ?)
+            """, (name, description))
+
+            conn.commit()
+            db.invalidate('categories')
+            db.echo(f"✅ Категория '{name}' успешно добавлена!")
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            db.echo(f"❌ Ошибка: категория с таким названием уже существует")
             return None
-        
-        # Проверяем существование категории
-        cursor.execute("SELECT id FROM categories WHERE id = ?", (category_id,))
-        if not cursor.fetchone():
-            print(f"❌ Ошибка: категория с ID {category_id} не существует")
+        except sqlite3.Error as e:
+            db.echo(f"❌ Ошибка при добавлении категории: {e}")
             return None
-        
-        cursor.execute("""
-            INSERT INTO posts (title, content, user_id, category_id) 
-            VALUES (?, ?, ?, ?)
-        """, (title, content, user_id, category_id))
-        
-        conn.commit()
-        print(f"✅ Пост '{title}' успешно создан!")
-        return cursor.lastrowid
-    except sqlite3.Error as e:
-        print(f"❌ Ошибка при создании поста: {e}")
-        return None
-    finally:
-        conn.close()
 
-def add_comment(text, post_id, user_id):
-    """Добавление комментария к посту"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
-    try:
-        # Проверяем существование поста
-        cursor.execute("SELECT id FROM posts WHERE id = ?", (post_id,))
-        if not cursor.fetchone():
-            print(f"❌ Ошибка: пост с ID {post_id} не существует")
+def create_post(title, content, user_id, category_id, db=None):
+    """Создание нового поста"""
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.create_post(title, content, user_id, category_id)
+    if db.write_queue is not None:
+        post_id = db.write_queue.submit_post(title, content, user_id, category_id).result()
+        if post_id is not None:
+            db.echo(f"✅ Пост '{title}' успешно создан!")
+        return post_id
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # Проверяем существование пользователя
+            cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
+            if not cursor.fetchone():
+                db.echo(f"❌ Ошибка: пользователь с ID {user_id} не существует")
+                return None
+
+            # Проверяем существование категории
+            cursor.execute("SELECT id FROM categories WHERE id = ?", (category_id,))
+            if not cursor.fetchone():
+                db.echo(f"❌ Ошибка: категория с ID {category_id} не существует")
+                return None
+
+            cursor.execute("""
+                INSERT INTO posts (title, content, user_id, category_id) 
+                VALUES (?, ?, ?, ?)
+            """, (title, content, user_id, category_id))
+
+            conn.commit()
+            db.invalidate('posts', 'users')
+            db.echo(f"✅ Пост '{title}' успешно создан!")
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            db.echo(f"❌ Ошибка при создании поста: {e}")
             return None
-        
-        # Проверяем существование пользователя
-        cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
-        if not cursor.fetchone():
-            print(f"❌ Ошибка: пользователь с ID {user_id} не существует")
+
+def add_comment(text, post_id, user_id, db=None):
+    """Добавление комментария к посту"""
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.add_comment(text, post_id, user_id)
+    if db.write_queue is not None:
+        comment_id = db.write_queue.submit_comment(text, post_id, user_id).result()
+        if comment_id is not None:
+            db.echo(f"✅ Комментарий успешно добавлен!")
+        return comment_id
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # Проверяем существование поста
+            cursor.execute("SELECT id FROM posts WHERE id = ?", (post_id,))
+            if not cursor.fetchone():
+                db.echo(f"❌ Ошибка: пост с ID {post_id} не существует")
+                return None
+
+            # Проверяем существование пользователя
+            cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
+            if not cursor.fetchone():
+                db.echo(f"❌ Ошибка: пользователь с ID {user_id} не существует")
+                return None
+
+            cursor.execute("""
+                INSERT INTO comments (text, post_id, user_id) 
+                VALUES (?, ?, ?)
+            """, (text, post_id, user_id))
+
+            conn.commit()
+            db.invalidate('comments', f'comments:{post_id}')
+            db.echo(f"✅ Комментарий успешно добавлен!")
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            db.echo(f"❌ Ошибка при добавлении комментария: {e}")
             return None
-        
-        cursor.execute("""
-            INSERT INTO comments (text, post_id, user_id) 
-            VALUES (?, ?, ?)
-        """, (text, post_id, user_id))
-        
-        conn.commit()
-        print(f"✅ Комментарий успешно добавлен!")
-        return cursor.lastrowid
-    except sqlite3.Error as e:
-        print(f"❌ Ошибка при добавлении комментария: {e}")
-        return None
-    finally:
-        conn.close()
 
-def get_all_posts_with_authors():
-    """Получение всех постов с именами авторов и категориями (используя JOIN)"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
+# Пакетная загрузка данных
+
+BulkResult = namedtuple('BulkResult', ['inserted', 'rejected'])
+BulkResult.__doc__ = """Итог пакетной загрузки: число вставленных строк и список
+(индекс, строка, причина) для отклоненных"""
+
+def _existing_values(cursor, table, column, values):
+    """Какие из значений уже есть в таблице - один запрос на весь набор
+
+    Возвращаются сами переданные значения, сравненные по правилам SQLite,
+    как в WHERE column = ?: для id строка '5' найдет строку с id 5.
+    """
+    if not values:
+        return set()
+    cursor.execute(
+        f"SELECT j.value FROM json_each(?) AS j "
+        f"WHERE EXISTS (SELECT 1 FROM {table} WHERE {column} = j.value)",
+        (json.dumps(list(values)),)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def _bulk_insert(db, rows, chunk_size, insert_sql, validate_chunk, label, tags):
+    """Вставка строк пачками через executemany в одной транзакции
+
+    validate_chunk(cursor, chunk) возвращает список пар (позиция в пачке,
+    причина) для строк, которые вставлять нельзя; tags - теги кэша, которые
+    сбрасываются после фиксации. При ошибке SQLite вся
+    загрузка откатывается, а в rejected попадает одна запись (None, None, ошибка).
+    """
+    db = _single_file_db(db, f"пакетная загрузка ({label})")
+    rows = iter(rows)
+    rejected = []
+    inserted = 0
+    start = 0
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            while True:
+                chunk = [tuple(row) for row in islice(rows, chunk_size)]
+                if not chunk:
+                    break
+                bad = dict(validate_chunk(cursor, chunk))
+                for offset in sorted(bad):
+                    rejected.append((start + offset, chunk[offset], bad[offset]))
+                cursor.executemany(insert_sql, [row for offset, row in enumerate(chunk)
+                                                if offset not in bad])
+                inserted += len(chunk) - len(bad)
+                start += len(chunk)
+
+            conn.commit()
+            db.invalidate(*tags)
+            db.echo(f"✅ {label}: добавлено {inserted}, отклонено {len(rejected)}")
+            return BulkResult(inserted, rejected)
+        except sqlite3.Error as e:
+            # Транзакция откатывается целиком - не вставлено ничего
+            conn.rollback()
+            db.echo(f"❌ Ошибка при пакетной загрузке ({label}): {e}")
+            return BulkResult(0, [(None, None, str(e))])
+
+def _reject_missing(cursor, chunk, table, position, label):
+    """Отклонение строк, ссылающихся на несуществующие записи"""
+    ids = {row[position] for row in chunk}
+    missing = ids - _existing_values(cursor, table, 'id', ids)
+    return [(offset, f"{label} с ID {row[position]} не существует")
+            for offset, row in enumerate(chunk) if row[position] in missing]
+
+def add_users_many(users, chunk_size=1000, db=None):
+    """Пакетное добавление пользователей: строки (username, email)"""
+    seen_names, seen_emails = set(), set()
+
+    def validate(cursor, chunk):
+        names = _existing_values(cursor, 'users', 'username', {row[0] for row in chunk})
+        emails = _existing_values(cursor, 'users', 'email', {row[1] for row in chunk})
+        bad = []
+        for offset, (username, email) in enumerate(chunk):
+            if username in names or username in seen_names:
+                bad.append((offset, f"пользователь '{username}' уже существует"))
+            elif email in emails or email in seen_emails:
+                bad.append((offset, f"email '{email}' уже существует"))
+            else:
+                seen_names.add(username)
+                seen_emails.add(email)
+        return bad
+
+    return _bulk_insert(db, users, chunk_size, """
+        INSERT INTO users (username, email) VALUES (?, ?)
+    """, validate, "пользователи", ('users',))
+
+def add_categories_many(categories, chunk_size=1000, db=None):
+    """Пакетное добавление категорий: строки (name, description)"""
+    seen = set()
+    rows = ((row[0], row[1] if len(row) > 1 else None) for row in categories)
+
+    def validate(cursor, chunk):
+        existing = _existing_values(cursor, 'categories', 'name', {row[0] for row in chunk})
+        bad = []
+        for offset, (name, _) in enumerate(chunk):
+            if name in existing or name in seen:
+                bad.append((offset, f"категория '{name}' уже существует"))
+            else:
+                seen.add(name)
+        return bad
+
+    return _bulk_insert(db, rows, chunk_size, """
+        INSERT INTO categories (name, description) VALUES (?, ?)
+    """, validate, "категории", ('categories',))
+
+def create_posts_many(posts, chunk_size=1000, db=None):
+    """Пакетное создание постов: строки (title, content, user_id, category_id)"""
+    def validate(cursor, chunk):
+        bad = dict(_reject_missing(cursor, chunk, 'users', 2, "пользователь"))
+        for offset, reason in _reject_missing(cursor, chunk, 'categories', 3, "категория"):
+            bad.setdefault(offset, reason)
+        return bad.items()
+
+    return _bulk_insert(db, posts, chunk_size, """
+        INSERT INTO posts (title, content, user_id, category_id) VALUES (?, ?, ?, ?)
+    """, validate, "посты", ('posts', 'users'))
+
+def add_comments_many(comments, chunk_size=1000, db=None):
+    """Пакетное добавление комментариев: строки (text, post_id, user_id)"""
+    # Теги кэша для затронутых постов добавляются по ходу проверки пачек
+    tags = {'comments'}
+
+    def validate(cursor, chunk):
+        bad = dict(_reject_missing(cursor, chunk, 'posts', 1, "пост"))
+        for offset, reason in _reject_missing(cursor, chunk, 'users', 2, "пользователь"):
+            bad.setdefault(offset, reason)
+        tags.update(f'comments:{row[1]}' for offset, row in enumerate(chunk) if offset not in bad)
+        return bad.items()
+
+    return _bulk_insert(db, comments, chunk_size, """
+        INSERT INTO comments (text, post_id, user_id) VALUES (?, ?, ?)
+    """, validate, "комментарии", tags)
+
+# Групповая фиксация записей
+
+class GroupCommitQueue:
+    """Очередь отложенной записи для create_post и add_comment
+
+    Вызовы из многих потоков собираются в группы и фиксируются одной
+    транзакцией - как только набралось max_rows строк или прошло max_delay_ms
+    с первой строки группы (при max_delay_ms=0 группа - все, что накопилось
+    в очереди за время предыдущей фиксации). Вызывающий получает Future с id новой строки
+    (None, если пост/пользователь/категория не существует).
+
+    Чтобы обычные create_post/add_comment шли через очередь, ее нужно
+    назначить базе: db.write_queue = GroupCommitQueue(db). Тогда каждый вызов
+    ждет фиксации своей группы и возвращает id как раньше.
+
+    Гарантии сохранности:
+    - Future разрешается только после COMMIT группы. Пока он не разрешен,
+      строка существует только в памяти процесса: при падении процесса
+      неразрешенные строки теряются, зафиксированные - нет.
+    - durability задает PRAGMA synchronous для соединения очереди:
+      'full' - fsync на каждую группу, подтвержденная строка переживает и
+      отключение питания; 'normal' (по умолчанию, WAL) - переживает падение
+      процесса, но последние группы могут пропасть при отключении питания;
+      'off' - без fsync, при сбое ОС файл базы может быть поврежден.
+    - close() и flush() дожидаются фиксации всего, что уже в очереди.
+    - Ошибка COMMIT (или любая другая ошибка записи группы) передается
+      исключением во все Future группы; поток записи продолжает работу.
+    - Если поток записи не получил соединение из пула, ошибка передается
+      во все Future в очереди, а очередь закрывается - новые вызовы
+      получают RuntimeError, а не ждут вечно.
+    """
+
+    DURABILITY_LEVELS = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+    def __init__(self, db=None, max_rows=500, max_delay_ms=5, durability='normal',
+                 max_pending=100_000):
+        if durability not in self.DURABILITY_LEVELS:
+            raise ValueError(f"Неизвестный режим durability: {durability}")
+        self.db = _single_file_db(db, 'GroupCommitQueue')
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.durability = durability
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error = None  # ошибка, остановившая поток записи
+        self._thread = threading.Thread(target=self._run, name='blog-group-commit', daemon=True)
+        self._thread.start()
+
+    def submit_comment(self, text, post_id, user_id):
+        """Комментарий в очередь; Future с id комментария"""
+        return self._submit('comment', (text, post_id, user_id))
+
+    def submit_post(self, title, content, user_id, category_id):
+        """Пост в очередь; Future с id поста"""
+        return self._submit('post', (title, content, user_id, category_id))
+
+    def flush(self, timeout=None):
+        """Дождаться фиксации всего, что поставлено в очередь до вызова"""
+        done = threading.Event()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put(('flush', None, done))
+        if closed:
+            # Поток записи уже дописывает остаток очереди или остановлен
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return done.wait(timeout)
+
+    def close(self):
+        """Зафиксировать остаток очереди и остановить поток записи"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(('stop', None, None))
+        self._thread.join()
+
+    def _submit(self, kind, params):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Очередь записи закрыта" + (f": {self._error}" if self._error else ""))
+            self._queue.put((kind, params, future))
+        return future
+
+    def _collect(self):
+        """Следующая группа: (строки, события flush, пора ли остановиться)"""
+        batch, flushed = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_delay
+        while True:
+            kind, params, target = item
+            if kind == 'stop':
+                return batch, flushed, True
+            if kind == 'flush':
+                flushed.append(target)
+                return batch, flushed, False
+            if target.set_running_or_notify_cancel():
+                batch.append(item)
+            if len(batch) >= self.max_rows:
+                return batch, flushed, False
+            # После срока группу еще добирают тем, что уже лежит в очереди
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, flushed, False
+
+    def _run(self):
+        try:
+            with self.db.connection() as conn:
+                conn.execute(f"PRAGMA synchronous = {self.DURABILITY_LEVELS[self.durability]}")
+                try:
+                    stop = False
+                    while not stop:
+                        batch, flushed, stop = self._collect()
+                        if batch:
+                            self._write(conn, batch)
+                        for event in flushed:
+                            event.set()
+                finally:
+                    conn.execute(f"PRAGMA synchronous = {self.db.synchronous}")
+        except Exception as e:
+            # Например, нет свободного соединения в пуле: ждущие Future не должны висеть
+            self.db.echo(f"❌ Поток групповой фиксации остановлен: {e}")
+            self._fail_pending(e)
+
+    def _fail_pending(self, error):
+        """Закрыть очередь и передать error во все Future, которые в ней остались"""
+        with self._lock:
+            self._closed = True
+            self._error = error
+        while True:
+            try:
+                kind, _, target = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'flush':
+                target.set()
+            elif kind != 'stop' and target.set_running_or_notify_cancel():
+                target.set_exception(error)
+
+    # Типы id, которые можно передать в запрос проверки (json_each)
+    ID_TYPES = (int, float, str, type(None))
+
+    def _write(self, conn, batch):
+        cursor = conn.cursor()
+        results = []
+        tags = set()
+        try:
+            # Строки с id неподдерживаемого типа отклоняются сразу, как sqlite3 в прямом пути
+            checked = []
+            for item in batch:
+                kind, params, future = item
+                ids = params[1:3] if kind == 'comment' else params[2:4]
+                unsupported = next((value for value in ids if not isinstance(value, self.ID_TYPES)), None)
+                if unsupported is not None:
+                    results.append((future, None, f"неподдерживаемый тип id: {type(unsupported).__name__}"))
+                else:
+                    checked.append(item)
+
+            comments = [params for kind, params, _ in checked if kind == 'comment']
+            posts = [params for kind, params, _ in checked if kind == 'post']
+            known_posts = _existing_values(cursor, 'posts', 'id', {row[1] for row in comments})
+            known_users = _existing_values(cursor, 'users', 'id',
+                                           {row[2] for row in comments} | {row[2] for row in posts})
+            known_categories = _existing_values(cursor, 'categories', 'id', {row[3] for row in posts})
+
+            for kind, params, future in checked:
+                if kind == 'comment':
+                    text, post_id, user_id = params
+                    if post_id not in known_posts:
+                        results.append((future, None, f"пост с ID {post_id} не существует"))
+                        continue
+                    sql = "INSERT INTO comments (text, post_id, user_id) VALUES (?, ?, ?)"
+                    row_tags = ('comments', f'comments:{post_id}')
+                else:
+                    title, content, user_id, category_id = params
+                    if category_id not in known_categories:
+                        results.append((future, None, f"категория с ID {category_id} не существует"))
+                        continue
+                    sql = "INSERT INTO posts (title, content, user_id, category_id) VALUES (?, ?, ?, ?)"
+                    row_tags = ('posts', 'users')
+                if user_id not in known_users:
+                    results.append((future, None, f"пользователь с ID {user_id} не существует"))
+                    continue
+
+                # Нарушение ограничения откатывает только эту вставку, не транзакцию
+                try:
+                    cursor.execute(sql, params)
+                except sqlite3.IntegrityError as e:
+                    results.append((future, None, str(e)))
+                    continue
+                results.append((future, cursor.lastrowid, None))
+                tags.update(row_tags)
+
+            conn.commit()
+        except Exception as e:
+            # Любая ошибка завершает только эту группу, поток записи продолжает работу
+            conn.rollback()
+            self.db.echo(f"❌ Ошибка групповой фиксации ({len(batch)} строк): {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        # Считаются только вставленные строки, отклоненные - нет
+        self.rows += sum(1 for _, _, error in results if error is None)
+        self.db.invalidate(*tags)
+        for future, row_id, error in results:
+            if error:
+                self.db.echo(f"❌ Ошибка: {error}")
+            future.set_result(row_id)
+
+# Лента постов с keyset-пагинацией
+
+PostRow = namedtuple('PostRow', ['id', 'title', 'content', 'created_at', 'author', 'category'])
+
+FEED_SQL = """
+    SELECT
+        p.id,
+        p.title,
+        p.content,
+        p.created_at,
+        u.username as author,
+        c.name as category
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    JOIN categories c ON p.category_id = c.id
+    {where}
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+"""
+
+def encode_feed_cursor(created_at, post_id):
+    """Непрозрачный токен продолжения ленты после поста (created_at, id)"""
+    raw = json.dumps([created_at, post_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_feed_cursor(token):
+    """Разбор токена продолжения; ValueError для поврежденного токена"""
     try:
-        cursor.execute("""
-            SELECT 
-                p.id,
-                p.title,
-                p.content,
-                p.created_at,
-                u.username as author,
-                c.name as category
-            FROM posts p
-            JOIN users u ON p.user_id = u.id
-            JOIN categories c ON p.category_id = c.id
-            ORDER BY p.created_at DESC
-        """)
-        
-        posts = cursor.fetchall()
-        
-        print("\n" + "="*80)
-        print("📝 ВСЕ ПОСТЫ В БЛОГЕ")
-        print("="*80)
-        
-        if not posts:
-            print("Пока нет ни одного поста")
-            return []
-        
-        for post in posts:
-            post_id, title, content, created_at, author, category = post
-            print(f"\n🏷️  ID: {post_id}")
-            print(f"📖 Заголовок: {title}")
-            print(f"📝 Содержание: {content[:100]}..." if len(content) > 100 else f"📝 Содержание: {content}")
-            print(f"👤 Автор: {author}")
-            print(f"📂 Категория: {category}")
-            print(f"📅 Дата: {created_at}")
-            print("-" * 80)
-        
-        return posts
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError, binascii.Error) as e:
+        raise ValueError(f"Некорректный токен ленты: {token!r}") from e
+    return created_at, int(post_id)
+
+def _check_page_size(page_size):
+    """ValueError для page_size < 1: LIMIT 0 дал бы пустую страницу, а отрицательный - всю таблицу"""
+    if page_size < 1:
+        raise ValueError(f"Размер страницы должен быть не меньше 1: {page_size}")
+
+def get_posts_page(page_size=50, cursor=None, db=None):
+    """Одна страница ленты: (список PostRow, токен следующей страницы или None)
+
+    ValueError, если page_size меньше 1.
+    """
+    _check_page_size(page_size)
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.posts_page(page_size, cursor)
+    if cursor is None:
+        sql, params = FEED_SQL.format(where=""), (page_size,)
+    else:
+        created_at, post_id = decode_feed_cursor(cursor)
+        sql = FEED_SQL.format(where="WHERE (p.created_at, p.id) < (?, ?)")
+        params = (created_at, post_id, page_size)
+
+    rows = list(_cached(db, ('posts_page', page_size, cursor), ('posts',),
+                        lambda: _fetch_rows(db, sql, params, PostRow)))
+
+    next_cursor = None
+    if len(rows) == page_size:
+        last = rows[-1]
+        next_cursor = encode_feed_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+def iter_posts_feed(page_size=50, cursor=None, db=None):
+    """Генератор всех постов от новых к старым, страница за страницей
+
+    В памяти держится не больше одной страницы, соединение берется из пула
+    только на время запроса страницы.
+    """
+    while True:
+        rows, cursor = get_posts_page(page_size, cursor, db=db)
+        yield from rows
+        if cursor is None:
+            return
+
+def print_posts(posts, echo=print):
+    """Вывод постов в консоль; принимает любой итерируемый источник PostRow"""
+    echo("\n" + "="*80)
+    echo("📝 ВСЕ ПОСТЫ В БЛОГЕ")
+    echo("="*80)
+
+    count = 0
+    for post in posts:
+        count += 1
+        echo(f"\n🏷️  ID: {post.id}")
+        echo(f"📖 Заголовок: {post.title}")
+        echo(f"📝 Содержание: {post.content[:100]}..." if len(post.content) > 100 else f"📝 Содержание: {post.content}")
+        echo(f"👤 Автор: {post.author}")
+        echo(f"📂 Категория: {post.category}")
+        echo(f"📅 Дата: {post.created_at}")
+        echo("-" * 80)
+
+    if not count:
+        echo("Пока нет ни одного поста")
+    return count
+
+def get_all_posts_with_authors(db=None):
+    """Получение всех постов с именами авторов и категориями (используя JOIN)
+
+    Возвращает полный список; для больших таблиц используйте iter_posts_feed.
+    """
+    db = _resolve_db(db)
+    try:
+        if isinstance(db, ShardedBlogDatabase):
+            posts = db.all_posts()
+        else:
+            posts = list(iter_posts_feed(db=db))
     except sqlite3.Error as e:
-        print(f"❌ Ошибка при получении постов: {e}")
+        db.echo(f"❌ Ошибка при получении постов: {e}")
         return []
-    finally:
-        conn.close()
 
-def get_posts_with_comments():
+    print_posts(posts, echo=db.echo)
+    return posts
+
+POSTS_WITH_COMMENTS_SQL = """
+    SELECT
+        p.id as post_id,
+        p.title as post_title,
+        u1.username as post_author,
+        c.text as comment_text,
+        u2.username as comment_author,
+        c.created_at as comment_date
+    FROM posts p
+    JOIN users u1 ON p.user_id = u1.id
+    LEFT JOIN comments c ON p.id = c.post_id
+    LEFT JOIN users u2 ON c.user_id = u2.id
+    ORDER BY p.created_at DESC, p.id DESC, c.created_at ASC
+"""
+
+# Для слияния шардов: те же строки с датой поста в начале
+SHARD_POSTS_WITH_COMMENTS_SQL = POSTS_WITH_COMMENTS_SQL.replace(
+    "SELECT", "SELECT\n        p.created_at as post_created_at,", 1)
+
+def get_posts_with_comments(db=None):
     """Получение постов с комментариями и авторами комментариев"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
+    db = _resolve_db(db)
     try:
-        cursor.execute("""
-            SELECT 
-                p.id as post_id,
-                p.title as post_title,
-                u1.username as post_author,
-                c.text as comment_text,
-                u2.username as comment_author,
-                c.created_at as comment_date
-            FROM posts p
-            JOIN users u1 ON p.user_id = u1.id
-            LEFT JOIN comments c ON p.id = c.post_id
-            LEFT JOIN users u2 ON c.user_id = u2.id
-            ORDER BY p.created_at DESC, c.created_at ASC
-        """)
-        
-        results = cursor.fetchall()
-        
-        print("\n" + "="*80)
-        print("💬 ПОСТЫ С КОММЕНТАРИЯМИ")
-        print("="*80)
-        
-        current_post = None
-        for row in results:
-            post_id, post_title, post_author, comment_text, comment_author, comment_date = row
-            
-            if current_post != post_id:
-                current_post = post_id
-                print(f"\n📖 Пост: '{post_title}' (автор: {post_author})")
-                print("-" * 40)
-            
-            if comment_text:
-                print(f"   💭 {comment_author}: {comment_text}")
-                print(f"   📅 {comment_date}")
-            else:
-                print("   💭 Пока нет комментариев")
-        
-        return results
+        if isinstance(db, ShardedBlogDatabase):
+            results = db.posts_with_comments()
+        else:
+            results = list(_cached(db, ('posts_with_comments',), ('posts', 'comments'),
+                                   lambda: _fetch_rows(db, POSTS_WITH_COMMENTS_SQL)))
     except sqlite3.Error as e:
-        print(f"❌ Ошибка при получении постов с комментариями: {e}")
+        db.echo(f"❌ Ошибка при получении постов с комментариями: {e}")
         return []
-    finally:
-        conn.close()
 
-def get_users_with_post_count():
+    db.echo("\n" + "="*80)
+    db.echo("💬 ПОСТЫ С КОММЕНТАРИЯМИ")
+    db.echo("="*80)
+
+    current_post = None
+    for row in results:
+        post_id, post_title, post_author, comment_text, comment_author, comment_date = row
+
+        if current_post != post_id:
+            current_post = post_id
+            db.echo(f"\n📖 Пост: '{post_title}' (автор: {post_author})")
+            db.echo("-" * 40)
+
+        if comment_text:
+            db.echo(f"   💭 {comment_author}: {comment_text}")
+            db.echo(f"   📅 {comment_date}")
+        else:
+            db.echo("   💭 Пока нет комментариев")
+
+    return results
+
+CommentRow = namedtuple('CommentRow', ['id', 'post_id', 'author', 'text', 'created_at'])
+
+POST_COMMENTS_SQL = """
+    SELECT
+        c.id,
+        c.post_id,
+        u.username as author,
+        c.text,
+        c.created_at
+    FROM comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.post_id = ?
+    ORDER BY c.created_at ASC, c.id ASC
+    LIMIT ?
+"""
+
+def get_post_comments(post_id, limit=None, db=None):
+    """Комментарии одного поста от старых к новым (не больше limit)"""
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        # Комментарии лежат в шарде поста
+        db = db.shard_for(post_id)
+    # LIMIT -1 в SQLite означает отсутствие ограничения
+    params = (post_id, -1 if limit is None else limit)
+    try:
+        return list(_cached(db, ('post_comments', post_id, limit), (f'comments:{post_id}',),
+                            lambda: _fetch_rows(db, POST_COMMENTS_SQL, params, CommentRow)))
+    except sqlite3.Error as e:
+        db.echo(f"❌ Ошибка при получении комментариев поста {post_id}: {e}")
+        return []
+
+# Посты с вложенными списками комментариев
+
+PostThread = namedtuple('PostThread', ['id', 'title', 'author', 'created_at', 'comment_count', 'comments'])
+ThreadComment = namedtuple('ThreadComment', ['id', 'author', 'text', 'created_at'])
+
+THREAD_POSTS_SQL = """
+    SELECT
+        p.id,
+        p.title,
+        u.username as author,
+        p.created_at,
+        p.comment_count
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    {where}
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+"""
+
+THREAD_COMMENTS_SQL = """
+    SELECT
+        c.post_id,
+        c.id,
+        u.username as author,
+        c.text,
+        c.created_at
+    FROM comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.post_id IN (SELECT value FROM json_each(?))
+    ORDER BY c.post_id, c.created_at ASC, c.id ASC
+"""
+
+# Для лимита на пост - по подзапросу с LIMIT на каждый пост, склеенных UNION ALL:
+# каждый читает индекс idx_comments_post_id и останавливается на лимите
+THREAD_COMMENTS_LIMITED_PART_SQL = """
+    SELECT * FROM (
+        SELECT c.post_id, c.id, u.username as author, c.text, c.created_at
+        FROM comments c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.post_id = ?
+        ORDER BY c.created_at ASC, c.id ASC
+        LIMIT ?
+    )
+"""
+
+# SQLite ограничивает число частей составного SELECT (по умолчанию 500)
+_THREAD_POSTS_PER_QUERY = 100
+
+def _load_thread_comments(db, post_ids, comments_per_post):
+    """Комментарии сразу для пачки постов: {post_id: (ThreadComment, ...)}"""
+    grouped = {post_id: [] for post_id in post_ids}
+    with db.connection() as conn:
+        for start in range(0, len(post_ids), _THREAD_POSTS_PER_QUERY):
+            part = post_ids[start:start + _THREAD_POSTS_PER_QUERY]
+            if comments_per_post is None:
+                cursor = conn.execute(THREAD_COMMENTS_SQL, (json.dumps(part),))
+            else:
+                sql = " UNION ALL ".join([THREAD_COMMENTS_LIMITED_PART_SQL] * len(part))
+                params = [value for post_id in part for value in (post_id, comments_per_post)]
+                cursor = conn.execute(sql, params)
+            for post_id, comment_id, author, text, created_at in cursor:
+                grouped[post_id].append(ThreadComment(comment_id, author, text, created_at))
+    return tuple((post_id, tuple(comments)) for post_id, comments in grouped.items())
+
+def get_post_threads_page(page_size=20, cursor=None, comments_per_post=None, db=None):
+    """Страница постов с их комментариями: (список PostThread, токен следующей страницы)
+
+    Комментарии всех постов страницы читаются пакетными запросами, а не
+    плоским LEFT JOIN, где заголовок и автор поста повторяются в каждой строке.
+    comments_per_post ограничивает число первых комментариев на пост.
+    ValueError, если page_size меньше 1.
+    """
+    _check_page_size(page_size)
+    db = _resolve_db(db)
+    if isinstance(db, ShardedBlogDatabase):
+        return db.post_threads_page(page_size, cursor, comments_per_post)
+    if cursor is None:
+        sql, params = THREAD_POSTS_SQL.format(where=""), (page_size,)
+    else:
+        created_at, post_id = decode_feed_cursor(cursor)
+        sql = THREAD_POSTS_SQL.format(where="WHERE (p.created_at, p.id) < (?, ?)")
+        params = (created_at, post_id, page_size)
+
+    # comment_count меняется с каждым комментарием, поэтому страница зависит и от 'comments'
+    posts = _cached(db, ('thread_posts', page_size, cursor), ('posts', 'comments'),
+                    lambda: _fetch_rows(db, sql, params))
+    post_ids = [post[0] for post in posts]
+    comments = dict(_cached(db, ('thread_comments', tuple(post_ids), comments_per_post),
+                            tuple(f'comments:{post_id}' for post_id in post_ids),
+                            lambda: _load_thread_comments(db, post_ids, comments_per_post)))
+
+    threads = [PostThread(*post, comments[post[0]]) for post in posts]
+    next_cursor = None
+    if len(threads) == page_size:
+        last = threads[-1]
+        next_cursor = encode_feed_cursor(last.created_at, last.id)
+    return threads, next_cursor
+
+def iter_post_threads(page_size=20, cursor=None, comments_per_post=None, db=None):
+    """Генератор всех постов с комментариями, страница за страницей"""
+    while True:
+        threads, cursor = get_post_threads_page(page_size, cursor, comments_per_post, db=db)
+        yield from threads
+        if cursor is None:
+            return
+
+def print_post_threads(threads, echo=print):
+    """Вывод постов с комментариями в консоль"""
+    echo("\n" + "="*80)
+    echo("💬 ПОСТЫ С КОММЕНТАРИЯМИ")
+    echo("="*80)
+
+    for thread in threads:
+        echo(f"\n📖 Пост: '{thread.title}' (автор: {thread.author})")
+        echo("-" * 40)
+        for comment in thread.comments:
+            echo(f"   💭 {comment.author}: {comment.text}")
+            echo(f"   📅 {comment.created_at}")
+        if not thread.comments:
+            echo("   💭 Пока нет комментариев")
+        elif thread.comment_count > len(thread.comments):
+            echo(f"   … еще комментариев: {thread.comment_count - len(thread.comments)}")
+
+USERS_WITH_POST_COUNT_SQL = """
+    SELECT
+        id,
+        username,
+        email,
+        post_count
+    FROM users
+    ORDER BY post_count DESC
+"""
+
+def get_users_with_post_count(db=None):
     """Получение пользователей с количеством их постов"""
-    conn = sqlite3.connect('blog.db')
-    cursor = conn.cursor()
-    
+    db = _resolve_db(db)
     try:
-        cursor.execute("""
-            SELECT 
-                u.id,
-                u.username,
-                u.email,
-                COUNT(p.id) as post_count
-            FROM users u
-            LEFT JOIN posts p ON u.id = p.user_id
-            GROUP BY u.id, u.username, u.email
-            ORDER BY post_count DESC
-        """)
-        
-        users = cursor.fetchall()
-        
-        print("\n" + "="*50)
-        print("👥 ПОЛЬЗОВАТЕЛИ И ИХ АКТИВНОСТЬ")
-        print("="*50)
-        
-        for user in users:
-            user_id, username, email, post_count = user
-            print(f"👤 {username} ({email}) - постов: {post_count}")
-        
-        return users
+        if isinstance(db, ShardedBlogDatabase):
+            users = db.users_with_post_count()
+        else:
+            users = list(_cached(db, ('users_with_post_count',), ('users',),
+                                 lambda: _fetch_rows(db, USERS_WITH_POST_COUNT_SQL)))
     except sqlite3.Error as e:
-        print(f"❌ Ошибка при получении пользователей: {e}")
+        db.echo(f"❌ Ошибка при получении пользователей: {e}")
         return []
+
+    db.echo("\n" + "="*50)
+    db.echo("👥 ПОЛЬЗОВАТЕЛИ И ИХ АКТИВНОСТЬ")
+    db.echo("="*50)
+
+    for user in users:
+        user_id, username, email, post_count = user
+        db.echo(f"👤 {username} ({email}) - постов: {post_count}")
+
+    return users
+
+# Полнотекстовый поиск
+
+SearchHit = namedtuple('SearchHit', ['id', 'title', 'author', 'created_at', 'rank', 'snippet'])
+CommentHit = namedtuple('CommentHit', ['id', 'post_id', 'author', 'created_at', 'rank', 'snippet'])
+
+# Ранжирование bm25 внутри FTS5; совпадение в заголовке весит в 10 раз больше
+SEARCH_POSTS_SQL = """
+    SELECT
+        p.id,
+        p.title,
+        u.username as author,
+        p.created_at,
+        posts_fts.rank as rank,
+        snippet(posts_fts, -1, ?, ?, '…', 12) as snippet
+    FROM posts_fts
+    JOIN posts p ON p.id = posts_fts.rowid
+    JOIN users u ON p.user_id = u.id
+    WHERE posts_fts MATCH ? AND posts_fts.rank MATCH 'bm25(10.0, 1.0)'
+    ORDER BY posts_fts.rank
+    LIMIT ? OFFSET ?
+"""
+
+SEARCH_COMMENTS_SQL = """
+    SELECT
+        c.id,
+        c.post_id,
+        u.username as author,
+        c.created_at,
+        comments_fts.rank as rank,
+        snippet(comments_fts, 0, ?, ?, '…', 12) as snippet
+    FROM comments_fts
+    JOIN comments c ON c.id = comments_fts.rowid
+    JOIN users u ON c.user_id = u.id
+    WHERE comments_fts MATCH ?
+    ORDER BY comments_fts.rank
+    LIMIT ? OFFSET ?
+"""
+
+def _search(sql, row_type, tag, query, limit, offset, highlight, db):
+    db = _resolve_db(db)
+    params = (highlight[0], highlight[1], query, limit, offset)
+    try:
+        if isinstance(db, ShardedBlogDatabase):
+            return db.search(sql, row_type, tag, query, limit, offset, highlight)
+        return list(_cached(db, ('search', tag) + params, (tag,),
+                            lambda: _fetch_rows(db, sql, params, row_type)))
+    except sqlite3.Error as e:
+        db.echo(f"❌ Ошибка поиска по запросу '{query}': {e}")
+        return []
+
+def search_posts(query, limit=20, offset=0, highlight=('[', ']'), db=None):
+    """Поиск постов по заголовку и тексту (синтаксис FTS5), лучшие совпадения первыми"""
+    return _search(SEARCH_POSTS_SQL, SearchHit, 'posts', query, limit, offset, highlight, db)
+
+def search_comments(query, limit=20, offset=0, highlight=('[', ']'), db=None):
+    """Поиск комментариев по тексту (синтаксис FTS5), лучшие совпадения первыми"""
+    return _search(SEARCH_COMMENTS_SQL, CommentHit, 'comments', query, limit, offset, highlight, db)
+
+def _maintain_search_index(command, db):
+    db = _single_file_db(db, f"обслуживание поискового индекса ({command})")
+    with db.connection() as conn:
+        try:
+            conn.execute(f"INSERT INTO posts_fts (posts_fts) VALUES ('{command}')")
+            conn.execute(f"INSERT INTO comments_fts (comments_fts) VALUES ('{command}')")
+            conn.commit()
+            db.invalidate()
+            db.echo(f"✅ Поисковый индекс: {command} выполнен")
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            db.echo(f"❌ Ошибка обслуживания поискового индекса ({command}): {e}")
+            return False
+
+def rebuild_search_index(db=None):
+    """Полная пересборка поисковых индексов по таблицам posts и comments"""
+    return _maintain_search_index('rebuild', db)
+
+def optimize_search_index(db=None):
+    """Слияние сегментов поисковых индексов для ускорения запросов"""
+    return _maintain_search_index('optimize', db)
+
+# Снимок базы и потоковая выгрузка для аналитики
+
+SnapshotResult = namedtuple('SnapshotResult', ['path', 'pages', 'bytes', 'restarts', 'seconds'])
+ExportResult = namedtuple('ExportResult', ['table', 'path', 'rows', 'raw_bytes', 'file_bytes', 'seconds'])
+
+EXPORT_TABLES = ('users', 'categories', 'posts', 'comments')
+
+# Сжатие выбирается по расширению файла
+_EXPORT_OPENERS = {
+    '.gz': lambda path: gzip.open(path, 'wb', compresslevel=6),
+    '.bz2': lambda path: bz2.open(path, 'wb'),
+    '.xz': lambda path: lzma.open(path, 'wb', preset=1),
+}
+
+@contextmanager
+def _read_snapshot(db):
+    """Одна транзакция чтения на весь блок with
+
+    В режиме WAL читатель видит данные на момент начала транзакции и не мешает
+    писателям: их изменения копятся в WAL, пока снимок не будет закрыт.
+    """
+    with db.connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            yield conn
+        finally:
+            conn.rollback()
+
+def snapshot_database(dest, pages_per_step=1024, pause=0.0, db=None):
+    """Онлайн-копия базы через backup API порциями по pages_per_step страниц
+
+    Копируется согласованный снимок на момент начала: исходная база держится
+    в одной транзакции чтения, поэтому запись в нее во время копирования
+    не заставляет SQLite начинать копирование заново. pause - пауза между
+    порциями в секундах, чтобы копирование не забирало весь диск.
+    """
+    db = _single_file_db(db, 'snapshot_database()')
+    progress = {'pages': 0, 'remaining': None, 'restarts': 0}
+
+    def on_step(status, remaining, total):
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+        progress['remaining'] = remaining
+        progress['pages'] = total
+
+    start = time.perf_counter()
+    target = sqlite3.connect(dest)
+    try:
+        with _read_snapshot(db) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            conn.backup(target, pages=pages_per_step, progress=on_step, sleep=pause)
+    except sqlite3.Error as e:
+        db.echo(f"❌ Ошибка при создании снимка базы: {e}")
+        raise
     finally:
-        conn.close()
+        target.close()
+
+    result = SnapshotResult(dest, progress['pages'], progress['pages'] * page_size,
+                            progress['restarts'], time.perf_counter() - start)
+    db.echo(f"✅ Снимок базы сохранен в {dest}: {result.bytes / 2**20:.1f} МБ за {result.seconds:.2f} с")
+    return result
+
+# Один кодировщик на все строки: json.dumps с параметрами создает новый на каждый вызов
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+def _ndjson_chunk(columns, rows):
+    return "".join(_encode_json(dict(zip(columns, row))) + "\n" for row in rows)
+
+def _csv_chunk(buffer, writer, rows):
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+def export_table(table, path, fmt=None, chunk_size=10_000, db=None):
+    """Потоковая выгрузка таблицы в NDJSON или CSV, со сжатием по расширению
+
+    Строки читаются пачками по chunk_size, так что память не зависит от
+    размера таблицы. Формат берется из fmt или из имени файла:
+    "posts.csv.gz" - CSV со сжатием gzip, "posts.ndjson.xz" - NDJSON с xz.
+    """
+    db = _single_file_db(db, 'export_table()')
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Неизвестная таблица для выгрузки: {table}")
+    name = os.path.basename(path)
+    suffix = os.path.splitext(name)[1]
+    opener = _EXPORT_OPENERS.get(suffix, lambda path: open(path, 'wb'))
+    if fmt is None:
+        fmt = 'csv' if '.csv' in name else 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+
+    start = time.perf_counter()
+    rows_total = raw_bytes = 0
+    with _read_snapshot(db) as conn, opener(path) as out:
+        cursor = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+        columns = [column[0] for column in cursor.description]
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(columns)
+            header = buffer.getvalue().encode('utf-8')
+            out.write(header)
+            raw_bytes += len(header)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            text = _csv_chunk(buffer, writer, rows) if fmt == 'csv' else _ndjson_chunk(columns, rows)
+            data = text.encode('utf-8')
+            out.write(data)
+            raw_bytes += len(data)
+            rows_total += len(rows)
+
+    result = ExportResult(table, path, rows_total, raw_bytes, os.path.getsize(path),
+                          time.perf_counter() - start)
+    db.echo(f"✅ {table}: {rows_total} строк выгружено в {path}")
+    return result
+
+def export_database(directory, tables=('users', 'posts', 'comments'), fmt='ndjson',
+                    compression='gz', chunk_size=10_000, db=None):
+    """Выгрузка нескольких таблиц в каталог из одного согласованного снимка"""
+    db = _single_file_db(db, 'export_database()')
+    os.makedirs(directory, exist_ok=True)
+    extension = f".{fmt}" + (f".{compression}" if compression else "")
+    with _read_snapshot(db):
+        return [export_table(table, os.path.join(directory, table + extension), fmt=fmt,
+                             chunk_size=chunk_size, db=db)
+                for table in tables]
+
+# Шардирование по пользователям
+
+SHARD_SEQUENCE_SQL = """
+    CREATE TABLE IF NOT EXISTS shard_sequence (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+"""
+
+SHARD_USERS_WITH_POST_COUNT_SQL = """
+    SELECT
+        id,
+        username,
+        email,
+        post_count
+    FROM users
+    WHERE id % ? = ?
+    ORDER BY post_count DESC
+"""
+
+class ShardedBlogDatabase:
+    """Блог в нескольких файлах SQLite, разбитых по автору (user_id)
+
+    У каждого файла своя блокировка записи, поэтому писатели разных шардов
+    не мешают друг другу. Вместо BlogDatabase такой объект принимают:
+    create_blog_database, add_user, add_category, create_post, add_comment,
+    get_posts_page и iter_posts_feed, get_all_posts_with_authors,
+    get_posts_with_comments, get_post_comments, get_post_threads_page и
+    iter_post_threads, get_users_with_post_count, search_posts,
+    search_comments - чтения идут во все шарды параллельно и сливаются.
+    Пакетная загрузка (*_many), миграции, обслуживание индексов, снимки,
+    выгрузка и GroupCommitQueue работают с одним файлом и для шардов
+    выдают TypeError - их вызывают для каждого шарда из self.shards.
+
+    Раскладка:
+    - id выдаются как seq * N + номер шарда, поэтому шард строки - это id % N;
+    - пользователь живет в шарде crc32(username) % N, его посты - там же;
+    - комментарии лежат в шарде поста, чтобы работали внешние ключи и
+      счетчик comment_count;
+    - строки users и categories копируются во все шарды ради внешних ключей,
+      верный post_count - только в домашнем шарде пользователя.
+    """
+
+    def __init__(self, directory='blog_shards', shards=4, verbose=True, **options):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.verbose = verbose
+        # Ключи кэша не различают шарды, поэтому query_cache задает только настройки:
+        # у каждого шарда свой QueryCache с теми же ограничениями
+        cache = options.pop('query_cache', None)
+        self.shards = [BlogDatabase(os.path.join(directory, f'shard_{n}.db'), verbose=False,
+                                    query_cache=None if cache is None else
+                                    QueryCache(cache.max_entries, cache.ttl, cache.max_bytes),
+                                    **options)
+                       for n in range(shards)]
+        self._executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='blog-shard')
+
+    def echo(self, message):
+        if self.verbose:
+            print(message)
+
+    def invalidate(self, *tags):
+        for shard in self.shards:
+            shard.invalidate(*tags)
+
+    def shard_for(self, row_id):
+        """Шард, в котором лежит пользователь, пост или комментарий с этим id"""
+        return self.shards[row_id % len(self.shards)]
+
+    def gather(self, func):
+        """func(шард) параллельно по всем шардам, результаты в порядке шардов"""
+        return list(self._executor.map(func, self.shards))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for shard in self.shards:
+            shard.close()
+
+    def create(self, apply_migrations=True):
+        def create_shard(shard):
+            create_blog_database(db=shard, apply_migrations=apply_migrations)
+            with shard.connection() as conn:
+                conn.execute(SHARD_SEQUENCE_SQL)
+                conn.commit()
+
+        self.gather(create_shard)
+        self.echo(f"✅ База данных блога создана в {len(self.shards)} шардах ({self.directory})")
+
+    def _next_id(self, conn, name, shard_index):
+        seq = conn.execute("""
+            INSERT INTO shard_sequence (name, value) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1
+            RETURNING value
+        """, (name,)).fetchone()[0]
+        return seq * len(self.shards) + shard_index
+
+    def _insert(self, shard_index, table, columns, values, row_id=None, checks=()):
+        """Вставка строки в шард; без row_id id берется из последовательности шарда
+
+        checks - тройки (запрос, параметры, сообщение): если запрос ничего
+        не вернул, вставка не выполняется и выводится сообщение.
+        """
+        with self.shards[shard_index].connection() as conn:
+            for sql, params, message in checks:
+                if conn.execute(sql, params).fetchone() is None:
+                    self.echo(f"❌ Ошибка: {message}")
+                    return None
+            try:
+                if row_id is None:
+                    row_id = self._next_id(conn, table, shard_index)
+                placeholders = ", ".join("?" * (len(columns) + 1))
+                conn.execute(f"INSERT INTO {table} (id, {', '.join(columns)}) VALUES ({placeholders})",
+                             (row_id, *values))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        return row_id
+
+    def _replicate(self, table, row_id, columns, values, first_shard):
+        """Копия строки во все остальные шарды; при ошибке копии удаляются"""
+        done = [first_shard]
+        try:
+            for index in range(len(self.shards)):
+                if index != first_shard:
+                    self._insert(index, table, columns, values, row_id=row_id)
+                    done.append(index)
+        except sqlite3.Error:
+            for index in done:
+                with self.shards[index].connection() as conn:
+                    conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+                    conn.commit()
+            raise
+
+    def add_user(self, username, email):
+        home = zlib.crc32(username.encode('utf-8')) % len(self.shards)
+        columns, values = ('username', 'email'), (username, email)
+        try:
+            user_id = self._insert(home, 'users', columns, values)
+            self._replicate('users', user_id, columns, values, home)
+        except sqlite3.IntegrityError:
+            self.echo(f"❌ Ошибка: пользователь с таким именем или email уже существует")
+            return None
+        except sqlite3.Error as e:
+            self.echo(f"❌ Ошибка при добавлении пользователя: {e}")
+            return None
+        self.invalidate('users')
+        self.echo(f"✅ Пользователь '{username}' успешно добавлен!")
+        return user_id
+
+    def add_category(self, name, description=None):
+        columns, values = ('name', 'description'), (name, description)
+        try:
+            category_id = self._insert(0, 'categories', columns, values)
+            self._replicate('categories', category_id, columns, values, 0)
+        except sqlite3.IntegrityError:
+            self.echo(f"❌ Ошибка: категория с таким названием уже существует")
+            return None
+        except sqlite3.Error as e:
+            self.echo(f"❌ Ошибка при добавлении категории: {e}")
+            return None
+        self.invalidate('categories')
+        self.echo(f"✅ Категория '{name}' успешно добавлена!")
+        return category_id
+
+    def create_post(self, title, content, user_id, category_id):
+        home = user_id % len(self.shards)
+        try:
+            post_id = self._insert(home, 'posts', ('title', 'content', 'user_id', 'category_id'),
+                                   (title, content, user_id, category_id), checks=(
+                ("SELECT id FROM users WHERE id = ?", (user_id,),
+                 f"пользователь с ID {user_id} не существует"),
+                ("SELECT id FROM categories WHERE id = ?", (category_id,),
+                 f"категория с ID {category_id} не существует"),
+            ))
+        except sqlite3.Error as e:
+            self.echo(f"❌ Ошибка при создании поста: {e}")
+            return None
+        if post_id is not None:
+            self.shards[home].invalidate('posts', 'users')
+            self.echo(f"✅ Пост '{title}' успешно создан!")
+        return post_id
+
+    def add_comment(self, text, post_id, user_id):
+        shard = post_id % len(self.shards)
+        try:
+            comment_id = self._insert(shard, 'comments', ('text', 'post_id', 'user_id'),
+                                      (text, post_id, user_id), checks=(
+                ("SELECT id FROM posts WHERE id = ?", (post_id,),
+                 f"пост с ID {post_id} не существует"),
+                ("SELECT id FROM users WHERE id = ?", (user_id,),
+                 f"пользователь с ID {user_id} не существует"),
+            ))
+        except sqlite3.Error as e:
+            self.echo(f"❌ Ошибка при добавлении комментария: {e}")
+            return None
+        if comment_id is not None:
+            self.shards[shard].invalidate('comments', f'comments:{post_id}')
+            self.echo(f"✅ Комментарий успешно добавлен!")
+        return comment_id
+
+    def all_posts(self):
+        """Лента всех шардов: параллельные запросы и слияние по (created_at, id)"""
+        feeds = self.gather(lambda shard: list(iter_posts_feed(page_size=1000, db=shard)))
+        return list(heapq.merge(*feeds, key=lambda post: (post.created_at, post.id), reverse=True))
+
+    def posts_page(self, page_size, cursor):
+        """Страница ленты: по странице из каждого шарда, слияние, первые page_size"""
+        pages = self.gather(lambda shard: get_posts_page(page_size, cursor, db=shard)[0])
+        return self._merge_page(pages, page_size)
+
+    def post_threads_page(self, page_size, cursor, comments_per_post):
+        """Страница постов с комментариями; комментарии лежат в шарде поста"""
+        pages = self.gather(
+            lambda shard: get_post_threads_page(page_size, cursor, comments_per_post, db=shard)[0])
+        return self._merge_page(pages, page_size)
+
+    def _merge_page(self, pages, page_size):
+        rows = list(islice(heapq.merge(*pages, key=lambda row: (row.created_at, row.id), reverse=True),
+                           page_size))
+        next_cursor = None
+        if len(rows) == page_size:
+            next_cursor = encode_feed_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    def posts_with_comments(self):
+        """Посты с комментариями всех шардов в порядке ленты"""
+        def load(shard):
+            return _cached(shard, ('posts_with_comments', 'shard'), ('posts', 'comments'),
+                           lambda: _fetch_rows(shard, SHARD_POSTS_WITH_COMMENTS_SQL))
+
+        merged = heapq.merge(*self.gather(load), key=lambda row: (row[0], row[1]), reverse=True)
+        return [row[1:] for row in merged]
+
+    def search(self, sql, row_type, tag, query, limit, offset, highlight):
+        """Поиск во всех шардах, слияние по rank
+
+        rank (bm25) считается по статистике своего шарда, поэтому порядок
+        между шардами приблизительный.
+        """
+        params = (highlight[0], highlight[1], query, limit + offset, 0)
+        hits = self.gather(lambda shard: _cached(shard, ('search', tag) + params, (tag,),
+                                                 lambda: _fetch_rows(shard, sql, params, row_type)))
+        return list(islice(heapq.merge(*hits, key=lambda hit: hit.rank), offset, offset + limit))
+
+    def users_with_post_count(self):
+        """Пользователи из их домашних шардов, слитые по убыванию post_count"""
+        count = len(self.shards)
+
+        def load(shard):
+            index = self.shards.index(shard)
+            return _cached(shard, ('users_with_post_count', 'home', count, index), ('users',),
+                           lambda: _fetch_rows(shard, SHARD_USERS_WITH_POST_COUNT_SQL, (count, index)))
+
+        return list(heapq.merge(*self.gather(load), key=lambda user: user[3], reverse=True))
+
+# Асинхронный фасад для asyncio
+
+def _async_write(func):
+    async def method(self, *args, **kwargs):
+        return await self._submit(self._writer, func, args, kwargs)
+    method.__name__ = func.__name__
+    method.__doc__ = f"Асинхронный {func.__name__} через поток записи"
+    return method
+
+def _async_read(func):
+    async def method(self, *args, **kwargs):
+        return await self._submit(self._readers, func, args, kwargs)
+    method.__name__ = func.__name__
+    method.__doc__ = f"Асинхронный {func.__name__} через пул потоков чтения"
+    return method
+
+class AsyncBlogDatabase:
+    """Awaitable-версии функций модуля для asyncio
+
+    Все записи идут через один выделенный поток - SQLite допускает только
+    одного писателя, и так они не конкурируют за блокировку файла. Чтения
+    выполняются пулом потоков и в режиме WAL не ждут записи.
+    """
+
+    def __init__(self, db=None, readers=4):
+        if db is None:
+            db = BlogDatabase(pool_size=readers + 1, verbose=False)
+        self.db = db
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='blog-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='blog-reader')
+
+    async def _submit(self, executor, func, args, kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, db=self.db, **kwargs)
+        return await loop.run_in_executor(executor, call)
+
+    create_blog_database = _async_write(create_blog_database)
+    migrate = _async_write(migrate)
+    reconcile_counters = _async_write(reconcile_counters)
+    add_user = _async_write(add_user)
+    add_category = _async_write(add_category)
+    create_post = _async_write(create_post)
+    add_comment = _async_write(add_comment)
+    add_users_many = _async_write(add_users_many)
+    add_categories_many = _async_write(add_categories_many)
+    create_posts_many = _async_write(create_posts_many)
+    add_comments_many = _async_write(add_comments_many)
+
+    get_posts_page = _async_read(get_posts_page)
+    get_all_posts_with_authors = _async_read(get_all_posts_with_authors)
+    get_posts_with_comments = _async_read(get_posts_with_comments)
+    get_post_comments = _async_read(get_post_comments)
+    get_post_threads_page = _async_read(get_post_threads_page)
+    get_users_with_post_count = _async_read(get_users_with_post_count)
+    search_posts = _async_read(search_posts)
+    search_comments = _async_read(search_comments)
+
+    def close(self):
+        """Остановка потоков (дожидается начатых операций) и закрытие пула соединений"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+# Проверка планов выполнения запросов
+
+def shipped_queries():
+    """Запросы модуля с примерными параметрами для EXPLAIN QUERY PLAN"""
+    return {
+        'feed_first_page': (FEED_SQL.format(where=""), (50,)),
+        'feed_next_page': (FEED_SQL.format(where="WHERE (p.created_at, p.id) < (?, ?)"),
+                           ('2000-01-01 00:00:00', 1, 50)),
+        'posts_with_comments': (POSTS_WITH_COMMENTS_SQL, ()),
+        'users_with_post_count': (USERS_WITH_POST_COUNT_SQL, ()),
+        'post_comments': (POST_COMMENTS_SQL, (1, -1)),
+        'thread_posts': (THREAD_POSTS_SQL.format(where=""), (20,)),
+        'thread_comments': (THREAD_COMMENTS_SQL, ('[1, 2, 3]',)),
+        'thread_comments_limited': (THREAD_COMMENTS_LIMITED_PART_SQL, (1, 5)),
+        'search_posts': (SEARCH_POSTS_SQL, ('[', ']', 'python', 20, 0)),
+        'search_comments': (SEARCH_COMMENTS_SQL, ('[', ']', 'python', 20, 0)),
+    }
+
+def check_query_plans(db=None):
+    """Поиск запросов, которые читают таблицу полным сканированием
+
+    Проблемой считается SCAN без индекса и AUTOMATIC-индекс, который SQLite
+    строит на лету из-за отсутствия подходящего. Обход по индексу
+    (SCAN ... USING INDEX) и по индексу FTS5 (VIRTUAL TABLE) допустим. Возвращает список (запрос, строка плана).
+    """
+    db = _single_file_db(db, 'check_query_plans()')
+    problems = []
+    with db.connection() as conn:
+        for name, (sql, params) in shipped_queries().items():
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+                detail = row[-1]
+                full_scan = (detail.startswith("SCAN ") and " USING " not in detail
+                             and " VIRTUAL TABLE " not in detail)
+                if full_scan or "AUTOMATIC" in detail:
+                    problems.append((name, detail))
+
+    if problems:
+        for name, detail in problems:
+            db.echo(f"❌ {name}: {detail}")
+    else:
+        db.echo("✅ Все запросы используют индексы")
+    return problems
 
 # Демонстрация работы всех функций
 def demo_blog_system():
@@ -365,7 +2306,6 @@ def demo_blog_system():
 if __name__ == "__main__":
     demo_blog_system()
 
-
 def homework_functions():
     """Функции, требуемые в домашнем задании"""
     
@@ -0,0 +1,122 @@
+"""Проверки blog_database: python -m unittest (или pytest) из каталога dz8"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import blog_database as blog
+
+
+class ShardedCacheTest(unittest.TestCase):
+    """Чтения шардов с кэшем совпадают с чтениями без кэша"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.databases = {}
+        for name, cache in (('cached', blog.QueryCache()), ('plain', None)):
+            db = blog.ShardedBlogDatabase(os.path.join(self.tmp.name, name), shards=3,
+                                          verbose=False, query_cache=cache)
+            blog.create_blog_database(db=db)
+            users = [blog.add_user(f'user{n}', f'user{n}@example.com', db=db) for n in range(3)]
+            category = blog.add_category('Новости', db=db)
+            for n in range(6):
+                post = blog.create_post(f'Пост {n}', f'Текст поста {n}', users[n % 3], category, db=db)
+                blog.add_comment(f'Комментарий к посту {n}', post, users[(n + 1) % 3], db=db)
+            self.databases[name] = db
+
+    def tearDown(self):
+        for db in self.databases.values():
+            db.close()
+        self.tmp.cleanup()
+
+    def read_all(self, db):
+        posts, _ = blog.get_posts_page(10, db=db)
+        threads, _ = blog.get_post_threads_page(10, db=db)
+        return {
+            'feed': [post.id for post in posts],
+            'posts_with_comments': [row[:2] for row in blog.get_posts_with_comments(db=db)],
+            'threads': [(thread.id, len(thread.comments)) for thread in threads],
+            'comments': [comment.id for comment in blog.get_post_comments(posts[0].id, db=db)],
+            'search': sorted(hit.id for hit in blog.search_posts('Текст', db=db)),
+        }
+
+    def test_shards_do_not_share_cache_entries(self):
+        cached, plain = self.databases['cached'], self.databases['plain']
+        expected = self.read_all(plain)
+        self.assertEqual(len(set(expected['feed'])), 6)
+        # Второй проход читает из кэша
+        self.assertEqual(self.read_all(cached), expected)
+        self.assertEqual(self.read_all(cached), expected)
+        self.assertGreater(sum(shard.query_cache.hits for shard in cached.shards), 0)
+        self.assertEqual(len({id(shard.query_cache) for shard in cached.shards}), 3)
+
+
+class ProfilerBatchTest(unittest.TestCase):
+    """Медленный executemany пишется в журнал одной записью с планом по первой строке"""
+
+    def test_executemany_logs_row_count_and_first_row(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = blog.QueryProfiler(slow_query_ms=0)
+            db = blog.BlogDatabase(os.path.join(tmp, 'blog.db'), verbose=False, profiler=profiler)
+            try:
+                blog.create_blog_database(db=db)
+                user = blog.add_user('author', 'author@example.com', db=db)
+                post = blog.create_post('Пост', 'Текст', user, blog.add_category('Новости', db=db), db=db)
+                profiler.reset()
+                comments = [(f'Комментарий {n}', post, user) for n in range(5000)]
+                blog.add_comments_many(comments, chunk_size=5000, db=db)
+            finally:
+                db.close()
+        entry = next(entry for entry in profiler.slow_queries if entry['sql'].startswith('INSERT INTO comments'))
+        self.assertEqual(entry['batch_rows'], 5000)
+        self.assertEqual(entry['params'], ['Комментарий 0', str(post), str(user)])
+        # EXPLAIN выполнился: у простого INSERT план пустой, при ошибке был бы None
+        self.assertIsNotNone(entry['plan'])
+
+
+class GroupCommitQueueTest(unittest.TestCase):
+    """Счетчик строк и поведение очереди без соединения"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = blog.BlogDatabase(os.path.join(self.tmp.name, 'blog.db'), pool_size=1, timeout=1.0,
+                                    verbose=False)
+        blog.create_blog_database(db=self.db)
+        self.user = blog.add_user('author', 'author@example.com', db=self.db)
+        self.post = blog.create_post('Пост', 'Текст', self.user, blog.add_category('Новости', db=self.db),
+                                     db=self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_rows_count_only_committed(self):
+        commits = blog.GroupCommitQueue(self.db, max_delay_ms=50)
+        try:
+            futures = [commits.submit_comment('ok', self.post, self.user),
+                       commits.submit_comment('нет поста', self.post + 1000, self.user),
+                       commits.submit_comment('ok', self.post, self.user)]
+            results = [future.result(timeout=5) for future in futures]
+        finally:
+            commits.close()
+        self.assertIsNone(results[1])
+        self.assertEqual(commits.rows, 2)
+
+    def test_pending_futures_fail_without_connection(self):
+        # Единственное соединение пула занято - поток записи его не получит
+        with self.db.connection():
+            commits = blog.GroupCommitQueue(self.db)
+            future = commits.submit_comment('текст', self.post, self.user)
+            with self.assertRaises(sqlite3.OperationalError):
+                future.result(timeout=5)
+            self.assertTrue(commits.flush(timeout=5))
+            with self.assertRaises(RuntimeError):
+                commits.submit_comment('текст', self.post, self.user)
+
+
+if __name__ == '__main__':
+    unittest.main()